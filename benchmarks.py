@@ -0,0 +1,266 @@
+"""
+Benchmarks dos caminhos mais usados do algoritmo genético e da planta.
+
+Cada caso é cronometrado algumas vezes e vira uma linha JSON com o nome, os parâmetros e os tempos
+(em segundos). Guardando a saída de duas versões, dá para comparar uma com a outra:
+
+    python benchmarks.py --saida antes.jsonl
+    (muda o código)
+    python benchmarks.py --saida depois.jsonl --comparar antes.jsonl
+
+Outras opções:
+    --rapido        usa só as entradas menores de cada benchmark
+    --filtro texto  roda só os benchmarks cujo nome contém o texto
+"""
+from tipos_cromossomos import *
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Tamanho do lado da planta quadrada usada nos benchmarks
+LADO_PLANTA = 20
+# Um caso é repetido até somar esse tempo (ou até o máximo de repetições)
+TEMPO_MINIMO = 0.2
+MAXIMO_REPETICOES = 5
+
+POPULACOES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5]
+GRANULARIDADES = [4, 2, 1, 0.5, 0.25, 0.1]
+QUANTIDADES_PAREDES = [4, 40, 1000]
+
+# Registro dos benchmarks: nome -> função que gera os casos
+benchmarks = {}
+
+
+def benchmark(nome: str):
+    """
+    Registra uma função de benchmark. A função recebe rapido e gera pares (parametros, funcao):
+    o preparo dos dados fica fora da cronometragem, e só funcao é cronometrada.
+    """
+    def registrar(funcao):
+        benchmarks[nome] = funcao
+        return funcao
+    return registrar
+
+
+"""ENTRADAS"""
+
+
+def montar_planta(granularidade: float, qtd_paredes: int = 4, busca: BuscasPontos = BuscasPontos.VARREDURA):
+    """
+    Uma planta quadrada de lado LADO_PLANTA, com qtd_paredes paredes: as 4 externas e o resto de paredes
+    internas curtas, em posições aleatórias (mas sempre as mesmas).
+    """
+    planta = Planta(granularidade)
+    cantos = [(0, LADO_PLANTA), (LADO_PLANTA, LADO_PLANTA), (LADO_PLANTA, 0), (0, 0)]
+    for inicio, fim in zip(cantos, cantos[1:] + cantos[:1]):
+        planta.adicionar_parede(Ponto(*inicio), Ponto(*fim))
+
+    sorteio = random.Random(qtd_paredes)
+    for _ in range(qtd_paredes - 4):
+        x, y = sorteio.uniform(1, LADO_PLANTA - 3), sorteio.uniform(1, LADO_PLANTA - 3)
+        if sorteio.random() < 0.5:
+            planta.adicionar_parede([x, y], [x + 2, y])
+        else:
+            planta.adicionar_parede([x, y], [x, y + 2])
+
+    planta.procurar_pontos_internos(busca)
+    return planta
+
+
+def montar_cromossomos(tam_populacao: int):
+    random.seed(tam_populacao)
+    return [CromossomoQuadraticoDecimal.gerar() for _ in range(tam_populacao)]
+
+
+def preparar_potencia(granularidade: float, qtd_paredes: int, k: int = 2):
+    random.seed(k)
+    CromossomoPotencia.planta = montar_planta(granularidade, qtd_paredes)
+    CromossomoPotencia.k = k
+    return [CromossomoPotencia.gerar() for _ in range(100)]
+
+
+"""BENCHMARKS"""
+
+
+@benchmark("sortear_roleta")
+def _(rapido):
+    for tam_populacao in POPULACOES[:2] if rapido else POPULACOES:
+        cromossomos = montar_cromossomos(tam_populacao)
+        yield ({'tam_populacao': tam_populacao},
+               lambda: sortear_roleta(cromossomos, CromossomoQuadraticoDecimal.avaliar, tam_populacao // 2))
+
+
+@benchmark("sortear_roleta_vetorizada")
+def _(rapido):
+    for tam_populacao in POPULACOES[:2] if rapido else POPULACOES:
+        aptidoes = np.random.default_rng(0).random(tam_populacao)
+        yield ({'tam_populacao': tam_populacao},
+               lambda: sortear_roleta_vetorizada(aptidoes, tam_populacao // 2))
+
+
+@benchmark("sortear_torneio")
+def _(rapido):
+    for tam_populacao in POPULACOES[:2] if rapido else POPULACOES:
+        cromossomos = montar_cromossomos(tam_populacao)
+        yield ({'tam_populacao': tam_populacao},
+               lambda: sortear_torneio(cromossomos, CromossomoQuadraticoDecimal.avaliar, tam_populacao // 2))
+
+
+@benchmark("planta.procurar_pontos_internos")
+def _(rapido):
+    for busca in BuscasPontos:
+        for granularidade in GRANULARIDADES[:3] if rapido else GRANULARIDADES:
+            yield ({'busca': busca.name, 'granularidade': granularidade},
+                   lambda: montar_planta(granularidade, busca=busca))
+
+
+@benchmark("planta.encontrar")
+def _(rapido):
+    for granularidade in GRANULARIDADES[:3] if rapido else GRANULARIDADES:
+        planta = montar_planta(granularidade)
+        sorteio = random.Random(0)
+        pontos = [Ponto(sorteio.uniform(0, LADO_PLANTA), sorteio.uniform(0, LADO_PLANTA)) for _ in range(10 ** 4)]
+        yield ({'granularidade': granularidade, 'qtd_pontos': len(pontos)},
+               lambda: [planta.encontrar(p) for p in pontos])
+
+
+@benchmark("planta.simular_fontes")
+def _(rapido):
+    for qtd_paredes in QUANTIDADES_PAREDES[:2] if rapido else QUANTIDADES_PAREDES:
+        for granularidade in GRANULARIDADES[:3] if rapido else GRANULARIDADES:
+            planta = montar_planta(granularidade, qtd_paredes)
+            fonte = planta.encontrar(Ponto(LADO_PLANTA / 3, LADO_PLANTA / 3))
+            yield ({'granularidade': granularidade, 'qtd_paredes': qtd_paredes},
+                   lambda: planta.simular_fontes(fonte))
+
+
+@benchmark("cromossomo_potencia.avaliar")
+def _(rapido):
+    for qtd_paredes in QUANTIDADES_PAREDES[:2] if rapido else QUANTIDADES_PAREDES:
+        cromossomos = preparar_potencia(1, qtd_paredes)
+        yield ({'granularidade': 1, 'qtd_paredes': qtd_paredes, 'qtd_cromossomos': len(cromossomos)},
+               lambda: [CromossomoPotencia.avaliar(c) for c in cromossomos])
+
+
+@benchmark("cromossomo_potencia.reproduzir")
+def _(rapido):
+    cromossomos = preparar_potencia(1, 40)
+    yield ({'granularidade': 1, 'qtd_casais': len(cromossomos) // 2},
+           lambda: [CromossomoPotencia.reproduzir(pai, mae) for pai, mae in zip(cromossomos[0::2], cromossomos[1::2])])
+
+
+@benchmark("cromossomo_potencia.mutacionar")
+def _(rapido):
+    cromossomos = preparar_potencia(1, 40)
+    yield ({'granularidade': 1, 'qtd_cromossomos': len(cromossomos)},
+           lambda: [CromossomoPotencia.mutacionar(c, 1) for c in cromossomos])
+
+
+@benchmark("geracao.potencia")
+def _(rapido):
+    for tam_populacao in POPULACOES[:1] if rapido else POPULACOES[:3]:
+        preparar_potencia(1, 40)
+        algoritmo = AlgoritmoGenetico(CromossomoPotencia, tam_populacao=tam_populacao,
+                                      qtd_selecionados=tam_populacao // 2, selecao=Selecoes.TORNEIO, semente=0)
+        algoritmo.iniciar()
+        yield ({'tam_populacao': tam_populacao, 'granularidade': 1, 'qtd_paredes': 40},
+               algoritmo.proxima_geracao)
+
+
+@benchmark("geracao.decimal")
+def _(rapido):
+    for usar_lote in (False, True):
+        for tam_populacao in POPULACOES[:2] if rapido else POPULACOES:
+            algoritmo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, tam_populacao=tam_populacao,
+                                          qtd_selecionados=tam_populacao // 2, semente=0, usar_lote=usar_lote)
+            algoritmo.iniciar()
+            yield ({'tam_populacao': tam_populacao, 'usar_lote': usar_lote}, algoritmo.proxima_geracao)
+
+
+"""EXECUÇÃO"""
+
+
+def cronometrar(funcao) -> List[float]:
+    """Roda a função até somar TEMPO_MINIMO segundos (e pelo menos uma vez). Retorna o tempo de cada rodada."""
+    tempos = []
+    while len(tempos) < MAXIMO_REPETICOES and sum(tempos) < TEMPO_MINIMO:
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def versao_codigo() -> Union[str, None]:
+    """O commit atual do repositório, se der para descobrir."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def chave_resultado(resultado: dict):
+    return resultado['nome'], json.dumps(resultado['parametros'], sort_keys=True)
+
+
+def comparar(resultados: List[dict], arquivo_anterior: str):
+    """Imprime, na saída de erro, a razão entre os tempos atuais e os de uma execução anterior."""
+    with open(arquivo_anterior) as arquivo:
+        anteriores = {chave_resultado(r): r for r in map(json.loads, filter(str.strip, arquivo))}
+
+    for resultado in resultados:
+        anterior = anteriores.get(chave_resultado(resultado))
+        if anterior is None:
+            continue
+        razao = resultado['minimo'] / anterior['minimo'] if anterior['minimo'] else float('inf')
+        print("%-34s %-60s %10.6f -> %10.6f  (%.2fx)" % (
+            resultado['nome'], chave_resultado(resultado)[1], anterior['minimo'], resultado['minimo'], razao
+        ), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do algoritmo genético e da planta.")
+    parser.add_argument('--rapido', action='store_true', help="usa só as entradas menores")
+    parser.add_argument('--filtro', default='', help="roda só os benchmarks cujo nome contém esse texto")
+    parser.add_argument('--saida', help="arquivo onde gravar os resultados (JSON lines); sem ele, vai para a tela")
+    parser.add_argument('--comparar', help="resultados anteriores (JSON lines) para comparar com os atuais")
+    argumentos = parser.parse_args()
+
+    versao = versao_codigo()
+    saida = open(argumentos.saida, 'w') if argumentos.saida else sys.stdout
+    resultados = []
+    try:
+        for nome, casos in benchmarks.items():
+            if argumentos.filtro not in nome:
+                continue
+
+            for parametros, funcao in casos(argumentos.rapido):
+                tempos = cronometrar(funcao)
+                resultado = {
+                    'nome': nome,
+                    'parametros': parametros,
+                    'repeticoes': len(tempos),
+                    'minimo': min(tempos),
+                    'mediana': statistics.median(tempos),
+                    'versao': versao,
+                    'python': platform.python_version(),
+                }
+                resultados.append(resultado)
+                print(json.dumps(resultado), file=saida, flush=True)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+    if argumentos.comparar:
+        comparar(resultados, argumentos.comparar)
+
+
+if __name__ == "__main__":
+    main()
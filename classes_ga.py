@@ -1,6 +1,140 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
-from random import random, choices
-from typing import Union, List
+from functools import wraps
+from multiprocessing import Pipe, Process
+from threading import Lock, Thread
+from random import random, getrandbits, randrange, seed, getstate, setstate
+from typing import Union, List, Hashable
+
+import asyncio
+import json
+import numpy as np
+import os
+import pickle
+import sys
+import time
+
+
+# Marca a ausência de um item no cache (None pode ser um valor válido)
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache de tamanho limitado. Quando fica cheio, descarta o item que foi usado há mais tempo
+    (Least Recently Used).
+
+    Também conta quantas consultas encontraram o item (acertos) e quantas não encontraram (falhas).
+    As operações são protegidas por uma trava, então o cache pode ser usado por várias threads
+    (como as do AvaliadorAssincrono).
+    """
+
+    def __init__(self, tamanho_maximo: int = 1024):
+        if not isinstance(tamanho_maximo, int) or tamanho_maximo < 1:
+            raise Exception("O tamanho máximo do cache deve ser um inteiro positivo.")
+
+        self.tamanho_maximo = tamanho_maximo
+        self.itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = Lock()
+
+    def __getstate__(self):
+        # A trava não pode ser serializada (para o checkpoint ou para outro processo)
+        estado = self.__dict__.copy()
+        del estado['_trava']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._trava = Lock()
+
+    def buscar(self, chave: Hashable, padrao=None):
+        """
+        Retorna o valor guardado na chave, marcando-o como o mais recentemente usado.
+        Se a chave não estiver no cache, retorna padrao.
+        """
+        with self._trava:
+            valor = self.itens.get(chave, _AUSENTE)
+
+            if valor is _AUSENTE:
+                self.falhas += 1
+                return padrao
+
+            self.acertos += 1
+            self.itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave: Hashable, valor):
+        """Guarda o valor na chave. Se o cache passar do tamanho máximo, descarta o item mais antigo."""
+        with self._trava:
+            self.itens[chave] = valor
+            self.itens.move_to_end(chave)
+
+            if len(self.itens) > self.tamanho_maximo:
+                self.itens.popitem(last=False)
+
+    def limpar(self):
+        """Esvazia o cache e zera os contadores."""
+        with self._trava:
+            self.itens.clear()
+            self.acertos = 0
+            self.falhas = 0
+
+    @property
+    def estatisticas(self) -> dict:
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acertos": self.acertos / consultas if consultas else 0.0,
+            "tamanho": len(self.itens),
+            "tamanho_maximo": self.tamanho_maximo,
+        }
+
+    def __contains__(self, chave: Hashable):
+        return chave in self.itens
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _congelar(genes):
+    """Transforma listas (e listas de listas) em tuplas, para que os genes possam ser usados como chave."""
+    if isinstance(genes, (list, tuple)):
+        return tuple(_congelar(gene) for gene in genes)
+    return genes
+
+
+def _avaliar_com_cache(classe: type, avaliar):
+    """
+    Envolve a função avaliar de uma classe herdeira de Cromossomo. Se o cache da classe estiver ativo,
+    a aptidão é procurada nele antes de ser calculada.
+
+    O cache pode ser herdado (de quem chamou ativar_cache numa classe mãe), então a chave inclui a classe
+    que definiu este avaliar: classes com avaliações diferentes nunca veem as aptidões umas das outras.
+    avaliar recebe o cromossomo por último, para funcionar tanto como staticmethod quanto como classmethod.
+    """
+
+    @wraps(avaliar)
+    def avaliar_com_cache(*argumentos):
+        cache = classe._cache_aptidao
+        if cache is None:
+            # Cache desligado: nenhum custo além desta checagem
+            return avaliar(*argumentos)
+
+        chave = (classe, classe.chave_genes(argumentos[-1]))
+        aptidao = cache.buscar(chave, _AUSENTE)
+        if aptidao is _AUSENTE:
+            aptidao = avaliar(*argumentos)
+            cache.guardar(chave, aptidao)
+
+        return aptidao
+
+    avaliar_com_cache.avaliar_original = avaliar
+    return avaliar_com_cache
 
 
 class Cromossomo:
@@ -11,10 +145,77 @@ class Cromossomo:
     """
     # Informação genética
     genes = None
+    # Cache de aptidões. Fica desligado até alguém chamar ativar_cache
+    _cache_aptidao = None
 
     def __init__(self, genes=None):
         self.genes = genes
 
+    def __init_subclass__(cls, **kwargs):
+        """
+        Toda classe herdeira que define o seu avaliar ganha, automaticamente, a consulta ao cache de aptidões.
+        Assim, nenhuma classe herdeira precisa reescrever o seu avaliar para usar o cache.
+        """
+        super().__init_subclass__(**kwargs)
+
+        if 'avaliar' in cls.__dict__:
+            avaliar = cls.__dict__['avaliar']
+            # O avaliar continua do mesmo tipo: um classmethod continua recebendo a classe
+            tipo = classmethod if isinstance(avaliar, classmethod) else staticmethod
+            avaliar = getattr(avaliar, '__func__', avaliar)
+            cls.avaliar = tipo(_avaliar_com_cache(cls, avaliar))
+
+    @classmethod
+    def ativar_cache(cls, tamanho_maximo: int = 1024):
+        """
+        Liga o cache de aptidões da classe, que também vale para as classes herdeiras que não tiverem um cache
+        próprio. Cromossomos da mesma classe com os mesmos genes (segundo chave_genes) só são avaliados uma vez,
+        enquanto continuarem no cache.
+
+        Se a aptidão depender de algo além dos genes (por exemplo, a planta do CromossomoPotencia),
+        chame limpar_cache sempre que esse algo mudar.
+        """
+        cls._cache_aptidao = CacheLRU(tamanho_maximo)
+
+    @classmethod
+    def desativar_cache(cls):
+        """Desliga e descarta o cache de aptidões da classe."""
+        cls._cache_aptidao = None
+
+    @classmethod
+    def limpar_cache(cls):
+        """Esvazia o cache de aptidões da classe, se ele estiver ativo."""
+        if cls._cache_aptidao is not None:
+            cls._cache_aptidao.limpar()
+
+    @classmethod
+    def estatisticas_cache(cls) -> Union[dict, None]:
+        """Retorna os acertos, falhas e tamanho do cache de aptidões, ou None se o cache estiver desligado."""
+        if cls._cache_aptidao is None:
+            return None
+        return cls._cache_aptidao.estatisticas
+
+    @classmethod
+    def estado_compartilhado(cls) -> dict:
+        """
+        Retorna os atributos de classe dos quais avaliar depende (por exemplo, a planta do CromossomoPotencia).
+
+        A avaliação paralela envia esse estado uma única vez para cada processo trabalhador, que o seta
+        de volta na classe antes de começar a avaliar.
+        """
+        return {}
+
+    @staticmethod
+    def chave_genes(cromossomo: 'Cromossomo') -> Hashable:
+        """
+        Retorna uma chave que identifica os genes do cromossomo no cache de aptidões.
+        Dois cromossomos com a mesma chave devem ter a mesma aptidão.
+
+        Por padrão, listas viram tuplas. Se os genes não forem hashable, a classe herdeira deve
+        sobrescrever esse método.
+        """
+        return _congelar(cromossomo.genes)
+
     @staticmethod
     def gerar() -> 'Cromossomo':
         """Gera um cromossomo aleatoriamente"""
@@ -26,6 +227,22 @@ class Cromossomo:
         Essa função deve ser sobrescrita em cada problema específico."""
         raise NotImplementedError("Essa função deve ser implementada especificamete para seu problema")
 
+    @classmethod
+    async def avaliar_async(cls, cromossomo: 'Cromossomo') -> Union[int, float]:
+        """Versão assíncrona de avaliar, usada pelo AvaliadorAssincrono.
+        Por padrão, roda o avaliar numa thread, então o avaliar precisa ser thread-safe (os caches de
+        aptidão e de campos da Planta são). Classes que esperam por algo externo (um simulador,
+        um serviço) podem sobrescrevê-la para esperar sem ocupar uma thread.
+
+        Uma thread não pode ser interrompida: se a avaliação for cancelada, ela só termina quando o
+        avaliar terminar. Assim, quem esperar por ela sabe quando a thread foi liberada de fato."""
+        futuro = asyncio.get_running_loop().run_in_executor(None, cls.avaliar, cromossomo)
+        try:
+            return await asyncio.shield(futuro)
+        except asyncio.CancelledError:
+            await asyncio.wait([futuro])
+            raise
+
     @staticmethod
     def mutacionar(cromossomo: 'Cromossomo', chance_mutacao: float) -> 'Cromossomo':
         """Modifica aleatoriamente um gene"""
@@ -39,10 +256,205 @@ class Cromossomo:
         para o método default de reprodução."""
         raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
 
+    """PROTOCOLO DE LOTE (opcional)
+
+    Uma classe herdeira pode implementar os métodos abaixo para trabalhar com a população inteira
+    como um array numpy (tam_populacao, qtd_genes), em vez de um objeto por cromossomo.
+    O AlgoritmoGenetico usa esse protocolo quando é criado com usar_lote=True."""
+
+    @staticmethod
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Gera os genes de n cromossomos aleatoriamente, num array (n, qtd_genes)"""
+        raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
+
+    @staticmethod
+    def avaliar_lote(genes: np.ndarray) -> np.ndarray:
+        """Retorna um array com a aptidão de cada linha de genes"""
+        raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
+
+    @staticmethod
+    def mutacionar_lote(genes: np.ndarray, chance_mutacao: float, gerador: np.random.Generator) -> np.ndarray:
+        """Mutaciona cada linha de genes com chance chance_mutacao, retornando um novo array"""
+        raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
+
+    @staticmethod
+    def reproduzir_lote(pais: np.ndarray, maes: np.ndarray, gerador: np.random.Generator) -> np.ndarray:
+        """Cruza pais[i] com maes[i]. Retorna os filhos de todos os casais, os de cada casal em seguida"""
+        raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
+
+    @staticmethod
+    def de_lote(genes: np.ndarray) -> List['Cromossomo']:
+        """Transforma cada linha de genes num objeto cromossomo"""
+        raise NotImplementedError("Esse método deve ser definido pela classe herdeira")
+
+    @classmethod
+    def suporta_lote(cls) -> bool:
+        """Diz se a classe implementa todo o protocolo de lote."""
+        def funcao(classe, metodo):
+            metodo = getattr(classe, metodo)
+            return getattr(metodo, '__func__', metodo)
+
+        metodos = ('gerar_lote', 'avaliar_lote', 'mutacionar_lote', 'reproduzir_lote', 'de_lote')
+        return all(funcao(cls, metodo) is not funcao(Cromossomo, metodo) for metodo in metodos)
+
     def __repr__(self):
         return "%s (%.2f)" % (self.genes, self.__class__.avaliar(self))
 
 
+class CromossomoBinario(Cromossomo):
+    """
+    Modelo geral de um cromossomo cujos genes são uma sequência de num_bits bits.
+
+    Os genes de um cromossomo são guardados num int (o primeiro bit da sequência é o mais significativo),
+    então a mutação é um XOR e o crossover é feito com máscaras, sem converter para string.
+    No protocolo de lote, cada cromossomo é uma linha de um array uint64 (n, palavras), onde a palavra i
+    guarda os bits de valor 2^(64 i) até 2^(64 i + 63). Assim, o genoma pode ter qualquer tamanho.
+
+    A classe herdeira define num_bits e o avaliar (e o avaliar_lote, se quiser usar o protocolo de lote).
+    """
+    # Tamanho do genoma, em bits
+    num_bits = 8
+
+    def __init__(self, genes: Union[int, str] = None):
+        """genes pode ser um int ou uma string de '0' e '1', como '0100101'."""
+        if isinstance(genes, str):
+            genes = int(genes, 2)
+        super().__init__(genes)
+
+    @classmethod
+    def palavras(cls) -> int:
+        """Quantas palavras de 64 bits cada cromossomo ocupa no protocolo de lote."""
+        return -(-cls.num_bits // 64)
+
+    @classmethod
+    def bits(cls, genes: int) -> str:
+        """Retorna os genes como uma string de '0' e '1', do primeiro ao último bit."""
+        return format(genes, '0%db' % cls.num_bits)
+
+    @classmethod
+    def decodificar(cls, genes: int) -> int:
+        """Lê os genes como um inteiro com sinal, em complemento de dois."""
+        if genes >> (cls.num_bits - 1):
+            return genes - (1 << cls.num_bits)
+        return genes
+
+    @classmethod
+    def gerar(cls):
+        """Geramos num_bits bits aleatórios"""
+        return cls(getrandbits(cls.num_bits))
+
+    @classmethod
+    def mutacionar(cls, cromossomo: 'CromossomoBinario', chance_mutacao: float = 0.03):
+        """Inverte um bit aleatório do cromossomo. Essa mutação tem uma chance chance_mutacao de acontecer."""
+
+        if random() > chance_mutacao:
+            # Não modificar
+            return cromossomo
+
+        return cls(cromossomo.genes ^ (1 << randrange(cls.num_bits)))
+
+    @classmethod
+    def reproduzir(cls, pai: 'CromossomoBinario', mae: 'CromossomoBinario'):
+        """O método de reprodução default é o crossover de um ponto."""
+
+        return cls.reproduzir_crossover_1(pai, mae)
+
+    @classmethod
+    def reproduzir_crossover_1(cls, pai: 'CromossomoBinario', mae: 'CromossomoBinario'):
+        """Essa reprodução será crossover de um ponto, onde o ponto é aleatório, entre dois bits quaisquer
+        (cada filho recebe pelo menos um bit de cada genitor). O primeiro filho fica com os bits do pai até o ponto de corte e com os da mãe depois dele,
+        e o segundo filho fica com o contrário."""
+        # Quantos bits, a partir do último, vêm do outro genitor
+        qtd_finais = randrange(1, cls.num_bits)
+        mascara = (1 << qtd_finais) - 1
+
+        filho_1 = (pai.genes & ~mascara) | (mae.genes & mascara)
+        filho_2 = (mae.genes & ~mascara) | (pai.genes & mascara)
+
+        return [cls(filho_1), cls(filho_2)]
+
+    """PROTOCOLO DE LOTE"""
+
+    @classmethod
+    def _mascaras_finais(cls, qtd_finais: np.ndarray) -> np.ndarray:
+        """Para cada valor de qtd_finais, monta um array (palavras,) com os qtd_finais bits menos
+        significativos ligados. Retorna um array (len(qtd_finais), palavras)."""
+        bits_na_palavra = np.clip(qtd_finais[:, None] - 64 * np.arange(cls.palavras()), 0, 64).astype(np.uint64)
+        # O shift de 64 bits não é definido, então as palavras cheias são tratadas à parte
+        mascaras = (np.uint64(1) << np.minimum(bits_na_palavra, np.uint64(63))) - np.uint64(1)
+        mascaras[bits_na_palavra == 64] = np.uint64(0xFFFFFFFFFFFFFFFF)
+        return mascaras
+
+    @classmethod
+    def gerar_lote(cls, n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Geramos n genomas de num_bits bits aleatórios"""
+        genes = gerador.integers(0, np.iinfo(np.uint64).max, size=(n, cls.palavras()), dtype=np.uint64,
+                                 endpoint=True)
+        return genes & cls._mascaras_finais(np.array([cls.num_bits]))
+
+    @classmethod
+    def mutacionar_lote(cls, genes: np.ndarray, chance_mutacao: float, gerador: np.random.Generator) -> np.ndarray:
+        """Inverte um bit aleatório de cada linha sorteada com chance chance_mutacao."""
+        mutados = np.flatnonzero(gerador.random(len(genes)) <= chance_mutacao)
+        posicoes = gerador.integers(0, cls.num_bits, size=len(mutados))
+
+        novos_genes = genes.copy()
+        novos_genes[mutados, posicoes // 64] ^= np.uint64(1) << (posicoes % 64).astype(np.uint64)
+
+        return novos_genes
+
+    @classmethod
+    def reproduzir_lote(cls, pais: np.ndarray, maes: np.ndarray, gerador: np.random.Generator) -> np.ndarray:
+        """O método de reprodução default é o crossover de um ponto."""
+
+        return cls.reproduzir_crossover_1_lote(pais, maes, gerador)
+
+    @classmethod
+    def reproduzir_crossover_1_lote(cls, pais: np.ndarray, maes: np.ndarray,
+                                    gerador: np.random.Generator) -> np.ndarray:
+        """Versão em lote do reproduzir_crossover_1. Os dois filhos de cada casal ficam em linhas seguidas."""
+        mascaras = cls._mascaras_finais(gerador.integers(1, cls.num_bits, size=len(pais)))
+
+        filhos = np.empty((len(pais), 2, cls.palavras()), dtype=np.uint64)
+        filhos[:, 0] = (pais & ~mascaras) | (maes & mascaras)
+        filhos[:, 1] = (maes & ~mascaras) | (pais & mascaras)
+
+        return filhos.reshape(-1, cls.palavras())
+
+    @classmethod
+    def decodificar_lote(cls, genes: np.ndarray) -> np.ndarray:
+        """
+        Lê cada linha de genes como um inteiro com sinal, em complemento de dois.
+
+        Genomas de até 64 bits são decodificados exatamente, num array int64. Os maiores viram float64.
+        """
+        if cls.num_bits <= 64:
+            valores = genes[:, 0].view(np.int64)
+            if cls.num_bits < 64:
+                valores = valores - (((valores >> (cls.num_bits - 1)) & 1) << cls.num_bits)
+            return valores
+
+        valores = np.zeros(len(genes))
+        for indice in range(cls.palavras() - 1, -1, -1):
+            valores = valores * 2.0 ** 64 + genes[:, indice]
+
+        negativos = (genes[:, -1] >> np.uint64((cls.num_bits - 1) % 64)) & np.uint64(1)
+        return valores - negativos * 2.0 ** cls.num_bits
+
+    @classmethod
+    def de_lote(cls, genes: np.ndarray):
+        cromossomos = []
+        for linha in genes.tolist():
+            valor = 0
+            for indice, palavra in enumerate(linha):
+                valor |= palavra << (64 * indice)
+            cromossomos.append(cls(valor))
+        return cromossomos
+
+    def __repr__(self):
+        return "%s (%.2f)" % (self.bits(self.genes), self.__class__.avaliar(self))
+
+
 """ENUMERAÇÕES"""
 
 
@@ -60,6 +472,30 @@ class Selecoes(Enum):
     """
     ROLETA = 1
     TORNEIO = 2
+    # Roleta com amostragem universal estocástica
+    AMOSTRAGEM_UNIVERSAL = 3
+
+
+class Topologias(Enum):
+    # Cada ilha manda seus migrantes para a ilha seguinte
+    ANEL = 1
+    # Cada ilha manda seus migrantes para todas as outras
+    COMPLETA = 2
+
+
+class MotivosParada(Enum):
+    # Todas as gerações (ou todo o resfriamento) foram executadas
+    LIMITE = 1
+    # A melhor aptidão chegou no alvo
+    ALVO = 2
+    # A melhor aptidão ficou paciencia gerações (ou passos) sem melhorar
+    PACIENCIA = 3
+    # A diversidade da população ficou abaixo do mínimo
+    DIVERSIDADE = 4
+    # O tempo acabou
+    TEMPO = 5
+    # O orçamento de avaliações acabou
+    AVALIACOES = 6
 
 
 class Objetivos(Enum):
@@ -87,76 +523,1211 @@ def sortear_roleta(cromossomos: list, avaliadora, qtd: int, objetivo: Objetivos
 
     OBSERVAÇÃO: Se houver substituição (substituicao = True) e o objetivo for minimizar, pode acontecer de eu retornar
     mais cromossomos do que foi pedido (com o parâmetro qtd)
+
+    Cada cromossomo é avaliado uma única vez, e o sorteio em si é feito por sortear_roleta_vetorizada.
     """
+    aptidoes = np.array([avaliadora(cromossomo) for cromossomo in cromossomos], dtype=float)
+    indices = sortear_roleta_vetorizada(aptidoes, qtd, objetivo, substituicao)
 
-    """Gerar as faixas de cada cromossomo"""
+    return [cromossomos[indice] for indice in indices]
 
-    acumulador_faixa = 0
-    lista_de_faixas = []
 
-    for cromossomo in cromossomos:
-        acumulador_faixa += avaliadora(cromossomo)
-        lista_de_faixas.append(acumulador_faixa)
+def _gerador_do_random() -> np.random.Generator:
+    """Um numpy.random.Generator semeado pelo random, para as funções chamadas sem gerador."""
+    return np.random.default_rng(getrandbits(64))
 
-    total = lista_de_faixas[-1]
-    cromossomos_selecionados = []
-    indices_cromossomos_escolhidos = set()
 
-    """Definir a forma de contagem, dependendo do objetivo"""
-    if objetivo == Objetivos.MAXIMIZAR:
-        # vou selecionar quem sobrevive: não muda nada
-        pass
+def _sortear_com_substituicao(pesos: np.ndarray, qtd: int, gerador: np.random.Generator, universal: bool):
+    """
+    Sorteia qtd índices, com substituição, com chance proporcional aos pesos.
+
+    Cada índice tem uma faixa na soma acumulada dos pesos. Os números sorteados são localizados
+    nas faixas por busca binária (searchsorted), então cada sorteio custa O(log n).
+
+    Se universal for True, usa a amostragem universal estocástica: um único número aleatório posiciona qtd
+    ponteiros igualmente espaçados ao longo das faixas.
+    """
+    faixas = np.cumsum(pesos)
+    total = faixas[-1]
+
+    if total <= 0:
+        # Ninguém tem peso: todos têm a mesma chance
+        return gerador.integers(0, len(pesos), size=qtd)
+
+    if universal:
+        numeros_sorteados = (gerador.random() + np.arange(qtd)) * (total / qtd)
     else:
-        # vou selecionar quem morre: a quantidade é invertida
-        qtd = len(cromossomos) - qtd
+        # Ordenar os números deixa a busca binária bem mais amigável ao cache; a ordem do sorteio não importa
+        numeros_sorteados = np.sort(gerador.random(qtd)) * total
 
-    """Começar a seleção"""
-    while len(cromossomos_selecionados) < qtd:
-        # Gerar um número entre 0 e o total de pontos de score
-        numero_sorteado = total * random()
+    # side='right' garante que uma faixa vazia (peso zero) nunca é escolhida
+    indices = np.searchsorted(faixas, numeros_sorteados, side='right')
+    # Protege contra erro de arredondamento no último elemento da soma acumulada
+    return np.minimum(indices, len(pesos) - 1)
+
+
+def _sortear_sem_substituicao(pesos: np.ndarray, qtd: int, gerador: np.random.Generator):
+    """
+    Sorteia qtd índices distintos, com chance proporcional aos pesos (algoritmo de Efraimidis-Spirakis).
+
+    Cada índice recebe a chave log(u) / peso, com u uniforme em (0, 1), e ficam os qtd índices de maiores chaves.
+    Isso equivale a sortear um por um, retirando o sorteado da roleta, mas custa O(n).
+    """
+    positivos = np.flatnonzero(pesos > 0)
+
+    if qtd >= len(positivos):
+        # Todos com peso entram, e o resto é completado com os de peso zero, escolhidos ao acaso
+        zerados = np.flatnonzero(pesos <= 0)
+        complemento = gerador.choice(zerados, size=qtd - len(positivos), replace=False)
+        return np.concatenate((positivos, complemento))
+
+    chaves = np.log(1.0 - gerador.random(len(positivos))) / pesos[positivos]
+    maiores = np.argpartition(chaves, len(chaves) - qtd)[len(chaves) - qtd:]
+    return positivos[maiores]
+
+
+def sortear_roleta_vetorizada(aptidoes: np.ndarray, qtd: int, objetivo: Objetivos = Objetivos.MINIMIZAR,
+                              substituicao: bool = False, universal: bool = False,
+                              gerador: np.random.Generator = None) -> np.ndarray:
+    """
+    Versão vetorizada de sortear_roleta. Recebe as aptidões já calculadas (um array, na ordem da população),
+    em vez da função avaliadora, e retorna um array com os índices dos cromossomos selecionados.
+
+    Segue as mesmas regras de sortear_roleta: se o objetivo for MAXIMIZAR, sorteia quem sobrevive; se for
+    MINIMIZAR, sorteia quem morre e retorna o restante. Se houver aptidões negativas, todas são deslocadas
+    para que a menor fique (quase) zero.
+
+    Se substituicao for False, um mesmo índice não é sorteado duas vezes. Se universal for True, o sorteio
+    é feito por amostragem universal estocástica, que sempre tem substituição.
+
+    O gerador é um numpy.random.Generator. Se não for informado, um novo é criado a partir do random,
+    então random.seed continua tornando o sorteio reprodutível.
+    """
+    aptidoes = np.asarray(aptidoes, dtype=float)
+    tam_populacao = len(aptidoes)
+
+    if gerador is None:
+        gerador = _gerador_do_random()
 
-        """Pegar o índice que corresponde à faixa do número sorteado"""
-        for indice, aptidao in enumerate(lista_de_faixas):
-            if indice in indices_cromossomos_escolhidos and not substituicao:
-                # vamos pular esse, que já foi escolhido
-                continue
+    if tam_populacao and aptidoes.min() < 0:
+        # O epsilon evita que o menos apto fique com peso zero
+        aptidoes = aptidoes - aptidoes.min() + 1e-9 * max(float(np.ptp(aptidoes)), 1.0)
+    if qtd > tam_populacao and not (substituicao or universal):
+        raise Exception("Sem substituição, não dá para sortear mais cromossomos do que o tamanho da população.")
 
-            if numero_sorteado <= aptidao:
-                cromossomos_selecionados.append(cromossomos[indice])
-                indices_cromossomos_escolhidos.add(indice)
-                break
+    """Definir a forma de contagem, dependendo do objetivo"""
+    if objetivo != Objetivos.MAXIMIZAR:
+        # vou selecionar quem morre: a quantidade é invertida
+        qtd = max(tam_populacao - qtd, 0)
+
+    """Começar a seleção"""
+    if qtd == 0:
+        indices_sorteados = np.empty(0, dtype=np.intp)
+    elif substituicao or universal:
+        indices_sorteados = _sortear_com_substituicao(aptidoes, qtd, gerador, universal)
+    else:
+        indices_sorteados = _sortear_sem_substituicao(aptidoes, qtd, gerador)
 
     """Definir o retorno: os que sobreviveram ou os que morreram?"""
     if objetivo == Objetivos.MAXIMIZAR:
-        return cromossomos_selecionados
-    else:
-        return [c for c in cromossomos if c not in cromossomos_selecionados]
+        return indices_sorteados
+
+    mortos = np.zeros(tam_populacao, dtype=bool)
+    mortos[indices_sorteados] = True
+    return np.flatnonzero(~mortos)
 
 
-def sortear_torneio(cromossomos: list, avaliadora, qtd: int, objetivo: Objetivos = Objetivos.MINIMIZAR):
+def sortear_torneio(cromossomos: list, avaliadora, qtd: int, objetivo: Objetivos = Objetivos.MINIMIZAR,
+                    tamanho_torneio: int = 3):
     """
     Recebe uma lista de cromossomos. Recebe a função avaliadora, que retorna a aptidão de um cromossomo.
     Recebe também a quantidade de cromossomos a serem selecionados.
 
     Retorna uma lista com os cromossomos relecionados.
 
-    Implementa o método de seleção Torneio, pegando de 3 em 3 candidatos.
+    Implementa o método de seleção Torneio, pegando de tamanho_torneio em tamanho_torneio candidatos (3, por padrão).
+
+    Cada cromossomo é avaliado uma única vez, e os torneios em si são feitos por sortear_torneio_vetorizado.
+    """
+    aptidoes = np.array([avaliadora(cromossomo) for cromossomo in cromossomos], dtype=float)
+    indices = sortear_torneio_vetorizado(aptidoes, qtd, tamanho_torneio, objetivo)
+
+    return [cromossomos[indice] for indice in indices]
+
+
+def sortear_torneio_vetorizado(aptidoes: np.ndarray, qtd: int, tamanho_torneio: int = 3,
+                               objetivo: Objetivos = Objetivos.MINIMIZAR,
+                               gerador: np.random.Generator = None) -> np.ndarray:
+    """
+    Versão vetorizada de sortear_torneio. Recebe as aptidões já calculadas (um array, na ordem da população),
+    em vez da função avaliadora, e retorna um array com os índices dos qtd vencedores.
+
+    Os qtd torneios são sorteados de uma vez só: uma matriz de qtd x tamanho_torneio índices. O vencedor de
+    cada linha é o de menor aptidão (MINIMIZAR) ou de maior aptidão (MAXIMIZAR).
+
+    O gerador é um numpy.random.Generator. Se não for informado, um novo é criado a partir do random.
     """
+    aptidoes = np.asarray(aptidoes, dtype=float)
+
+    if gerador is None:
+        gerador = _gerador_do_random()
+
+    if tamanho_torneio < 1:
+        raise Exception("O torneio precisa de pelo menos um candidato.")
+    if len(aptidoes) == 0:
+        raise Exception("Não dá para fazer torneio com uma população vazia.")
+
+    # Sortear todos os candidatos de todos os torneios
+    candidatos = gerador.integers(0, len(aptidoes), size=(qtd, tamanho_torneio))
+    aptidoes_candidatos = aptidoes[candidatos]
 
     if objetivo == Objetivos.MINIMIZAR:
-        # O torneio pega o primeiro, de menor fitness
-        indice_selecao = 0
+        # O torneio pega o de menor fitness
+        vencedores = np.argmin(aptidoes_candidatos, axis=1)
     else:
-        # O torneio pega o último, de maior fitness
-        indice_selecao = -1
+        # O torneio pega o de maior fitness
+        vencedores = np.argmax(aptidoes_candidatos, axis=1)
+
+    return candidatos[np.arange(qtd), vencedores]
+
+
+"""AVALIAÇÃO PARALELA"""
+
+# Classe de cromossomo usada por cada processo trabalhador (setada em _inicializar_trabalhador)
+_classe_trabalhador = None
+
+
+def _inicializar_trabalhador(classe_cromossomo: type, estado: dict):
+    """Roda uma vez em cada processo trabalhador: seta o estado compartilhado na classe do cromossomo."""
+    global _classe_trabalhador
+
+    for nome, valor in estado.items():
+        setattr(classe_cromossomo, nome, valor)
+
+    _classe_trabalhador = classe_cromossomo
+
+
+def _avaliar_no_trabalhador(cromossomo: Cromossomo):
+    return _classe_trabalhador.avaliar(cromossomo)
+
+
+class AvaliadorParalelo:
+    """
+    Avalia listas de cromossomos espalhando-os por um ProcessPoolExecutor.
+
+    Cada processo recebe, uma única vez, o estado compartilhado da classe (Cromossomo.estado_compartilhado),
+    então objetos grandes como a planta não são enviados de novo a cada tarefa. As aptidões voltam na
+    mesma ordem dos cromossomos, iguais às da avaliação serial.
+
+    Pode ser usado com with, ou chamando iniciar e encerrar.
+    """
+
+    def __init__(self, classe_cromossomo: type, num_processos: int = None, tamanho_lote: int = None):
+        """
+        num_processos = None usa a quantidade de processadores da máquina.
+        tamanho_lote é quantos cromossomos vão para um processo de cada vez. Se for None, cada processo
+        recebe uns 4 lotes por chamada de avaliar.
+        """
+        if tamanho_lote is not None and tamanho_lote < 1:
+            raise Exception("O tamanho do lote deve ser pelo menos 1.")
+
+        self.classe_cromossomo = classe_cromossomo
+        self.num_processos = num_processos or os.cpu_count() or 1
+        self.tamanho_lote = tamanho_lote
+        self.executor = None
+
+    def iniciar(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.num_processos,
+                initializer=_inicializar_trabalhador,
+                initargs=(self.classe_cromossomo, self.classe_cromossomo.estado_compartilhado())
+            )
+
+    def encerrar(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def avaliar(self, cromossomos: List[Cromossomo]) -> List[Union[int, float]]:
+        """Retorna as aptidões dos cromossomos, na mesma ordem."""
+        self.iniciar()
+
+        tamanho_lote = self.tamanho_lote
+        if tamanho_lote is None:
+            tamanho_lote = max(1, -(-len(cromossomos) // (4 * self.num_processos)))
+
+        return list(self.executor.map(_avaliar_no_trabalhador, cromossomos, chunksize=tamanho_lote))
 
-    cromossomos_selecionados = []
-    while len(cromossomos_selecionados) < qtd:
+    def __enter__(self):
+        self.iniciar()
+        return self
 
-        # Sortear 3 cromossomos aleatoriamente
-        cromossomos_sorteados = sorted(choices(cromossomos, k=3), key=avaliadora)
+    def __exit__(self, *args):
+        self.encerrar()
 
-        # Pegar o mais apto dos três
-        cromossomos_selecionados.append(cromossomos_sorteados[indice_selecao])
 
-    return cromossomos_selecionados
+"""AVALIAÇÃO ASSÍNCRONA"""
+
+
+class AvaliadorAssincrono:
+    """
+    Avalia listas de cromossomos concorrentemente num loop do asyncio, chamando classe_cromossomo.avaliar_async.
+
+    Serve para aptidões que passam a maior parte do tempo esperando (um simulador externo, um serviço):
+    até max_concorrentes avaliações ficam em andamento ao mesmo tempo. Cada tentativa tem até tempo_limite
+    segundos, e uma avaliação que falha (por erro ou tempo esgotado) é tentada de novo até somar tentativas
+    tentativas, esperando espera_entre_tentativas segundos entre elas. Se todas falharem, a avaliação levanta
+    o último erro, a não ser que aptidao_falha seja informada: aí o cromossomo fica com essa aptidão.
+
+    Uma tentativa com tempo esgotado é cancelada, mas continua ocupando sua vaga até terminar de fato
+    (uma thread não pode ser interrompida), então nunca há mais de max_concorrentes avaliações rodando.
+    Com o avaliar_async padrão, o avaliar roda em threads e precisa ser thread-safe.
+    """
+
+    def __init__(self, classe_cromossomo: type, max_concorrentes: int = 10, tempo_limite: float = None,
+                 tentativas: int = 1, espera_entre_tentativas: float = 0.0, aptidao_falha: float = None):
+        if max_concorrentes < 1:
+            raise Exception("Permita pelo menos uma avaliação concorrente.")
+        if tentativas < 1:
+            raise Exception("Faça pelo menos uma tentativa.")
+
+        self.classe_cromossomo = classe_cromossomo
+        self.max_concorrentes = max_concorrentes
+        self.tempo_limite = tempo_limite
+        self.tentativas = tentativas
+        self.espera_entre_tentativas = espera_entre_tentativas
+        self.aptidao_falha = aptidao_falha
+        # Quantas tentativas falharam, somando todas as chamadas
+        self.falhas = 0
+
+    async def _tentar(self, cromossomo: Cromossomo, semaforo: asyncio.Semaphore, tarefas: list):
+        """Uma tentativa. A vaga no semáforo só é devolvida quando a tarefa da avaliação termina."""
+        await semaforo.acquire()
+        tarefa = asyncio.ensure_future(self.classe_cromossomo.avaliar_async(cromossomo))
+        tarefa.add_done_callback(lambda _: semaforo.release())
+        tarefas.append(tarefa)
+        try:
+            # O shield faz o wait_for desistir de esperar sem esperar o cancelamento terminar
+            return await asyncio.wait_for(asyncio.shield(tarefa), self.tempo_limite)
+        finally:
+            if not tarefa.done():
+                tarefa.cancel()
+
+    async def _avaliar_um(self, cromossomo: Cromossomo, semaforo: asyncio.Semaphore,
+                          tarefas: list) -> Union[int, float]:
+        for tentativa in range(self.tentativas):
+            try:
+                return await self._tentar(cromossomo, semaforo, tarefas)
+            except Exception:
+                self.falhas += 1
+                if tentativa == self.tentativas - 1:
+                    if self.aptidao_falha is not None:
+                        return self.aptidao_falha
+                    raise
+                if self.espera_entre_tentativas:
+                    await asyncio.sleep(self.espera_entre_tentativas)
+
+    async def avaliar_async(self, cromossomos: List[Cromossomo]) -> List[Union[int, float]]:
+        """
+        Retorna as aptidões dos cromossomos, na mesma ordem. Para quem já está dentro de um loop do asyncio.
+        Antes de retornar, espera também as tentativas canceladas terminarem.
+        """
+        semaforo = asyncio.Semaphore(self.max_concorrentes)
+        tarefas = []
+        try:
+            return list(await asyncio.gather(*(self._avaliar_um(cromossomo, semaforo, tarefas)
+                                               for cromossomo in cromossomos)))
+        finally:
+            pendentes = [tarefa for tarefa in tarefas if not tarefa.done()]
+            if pendentes:
+                await asyncio.wait(pendentes)
+
+    def avaliar(self, cromossomos: List[Cromossomo]) -> List[Union[int, float]]:
+        """
+        Retorna as aptidões dos cromossomos, na mesma ordem, rodando um loop do asyncio até todas terminarem.
+        Não pode ser chamada de dentro de um loop do asyncio: lá, use await avaliar_async.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.avaliar_async(cromossomos))
+        raise Exception("Já existe um loop do asyncio rodando: use await AvaliadorAssincrono.avaliar_async.")
+
+
+"""CRITÉRIOS DE PARADA"""
+
+
+class CriteriosParada:
+    """
+    Decide quando uma execução (do AlgoritmoGenetico ou do recozimento) pode parar antes do limite de
+    gerações. Cada critério é opcional, e o primeiro que for atingido é o motivo da parada:
+
+    - alvo: a melhor aptidão chegou no alvo (ou passou dele, na direção do objetivo);
+    - paciencia: a melhor aptidão ficou paciencia verificações sem melhorar mais do que tolerancia;
+    - diversidade_minima: a fração de genomas distintos na população ficou abaixo desse valor;
+    - tempo_maximo: passaram tempo_maximo segundos desde iniciar;
+    - max_avaliacoes: foram feitas pelo menos max_avaliacoes avaliações.
+
+    Guarda o estado de uma execução, que é zerado por iniciar.
+    """
+
+    def __init__(self, alvo: float = None, paciencia: int = None, diversidade_minima: float = None,
+                 tempo_maximo: float = None, max_avaliacoes: int = None, tolerancia: float = 0.0):
+        self.alvo = alvo
+        self.paciencia = paciencia
+        self.diversidade_minima = diversidade_minima
+        self.tempo_maximo = tempo_maximo
+        self.max_avaliacoes = max_avaliacoes
+        self.tolerancia = tolerancia
+
+        # Setados ao iniciar:
+        self.inicio = None
+        self.melhor_aptidao = None
+        self.sem_melhora = 0
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self.melhor_aptidao = None
+        self.sem_melhora = 0
+
+    def verificar(self, melhor_aptidao: float, avaliacoes: int, objetivo: Objetivos = Objetivos.MINIMIZAR,
+                  diversidade: float = None) -> Union[MotivosParada, None]:
+        """
+        Chamada uma vez por geração (ou passo), com a melhor aptidão atual, o total de avaliações até agora
+        e, se diversidade_minima estiver configurada, a diversidade da população.
+        Retorna o motivo para parar, ou None para continuar.
+        """
+        if self.inicio is None:
+            self.iniciar()
+
+        # Trabalho sempre com "quanto menor, melhor"
+        sinal = 1 if objetivo == Objetivos.MINIMIZAR else -1
+
+        if self.alvo is not None and sinal * melhor_aptidao <= sinal * self.alvo:
+            return MotivosParada.ALVO
+
+        if self.paciencia is not None:
+            if self.melhor_aptidao is None or sinal * melhor_aptidao < sinal * self.melhor_aptidao - self.tolerancia:
+                self.melhor_aptidao = melhor_aptidao
+                self.sem_melhora = 0
+            else:
+                self.sem_melhora += 1
+                if self.sem_melhora >= self.paciencia:
+                    return MotivosParada.PACIENCIA
+
+        if self.diversidade_minima is not None and diversidade is not None and diversidade < self.diversidade_minima:
+            return MotivosParada.DIVERSIDADE
+
+        if self.tempo_maximo is not None and time.perf_counter() - self.inicio >= self.tempo_maximo:
+            return MotivosParada.TEMPO
+
+        if self.max_avaliacoes is not None and avaliacoes >= self.max_avaliacoes:
+            return MotivosParada.AVALIACOES
+
+        return None
+
+
+"""INSTRUMENTAÇÃO"""
+
+
+class Instrumentacao:
+    """
+    Mede o tempo gasto em cada fase de cada geração e conta operações dos caminhos mais usados
+    (avaliações, chamadas a encontrar, tentativas da reprodução, testes de interseção com paredes).
+
+    Só uma instrumentação fica ativa por vez, em Instrumentacao.ativa. Os pontos instrumentados só checam
+    se ela é None, então, com a instrumentação desligada, o custo é praticamente zero.
+
+    Ao fechar cada geração, o registro dela (tempos e contadores) é somado aos totais, fica em
+    self.ultima_geracao e, se houver um arquivo, é gravado nele como uma linha JSON. Só o último registro
+    fica na memória, então a instrumentação pode acompanhar execuções de qualquer tamanho; o histórico
+    completo fica no arquivo. self.resumo soma todas as gerações.
+    Operações feitas em outros processos (avaliação paralela, ilhas) não são contadas.
+    """
+    # A instrumentação ativa no momento, ou None
+    ativa = None
+
+    def __init__(self, arquivo=None):
+        """arquivo pode ser o caminho de um arquivo (aberto para acrescentar linhas) ou um objeto de arquivo."""
+        self.arquivo = arquivo
+        self._arquivo_aberto = None
+        # Quantas gerações foram fechadas, e o registro da última
+        self.qtd_geracoes = 0
+        self.ultima_geracao = None
+        self.tempos = {}
+        self.contadores = {}
+        self.tempos_totais = {}
+        self.contadores_totais = {}
+
+    def ativar(self):
+        Instrumentacao.ativa = self
+
+    def desativar(self):
+        if Instrumentacao.ativa is self:
+            Instrumentacao.ativa = None
+        if self._arquivo_aberto is not None:
+            self._arquivo_aberto.close()
+            self._arquivo_aberto = None
+
+    def contar(self, nome: str, quantidade: int = 1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def adicionar_tempo(self, fase: str, segundos: float):
+        self.tempos[fase] = self.tempos.get(fase, 0.0) + segundos
+
+    @contextmanager
+    def medir(self, fase: str):
+        """Soma o tempo do bloco with à fase."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.adicionar_tempo(fase, time.perf_counter() - inicio)
+
+    def fechar_geracao(self, geracao: int) -> dict:
+        """Fecha o registro da geração, começa um novo e retorna o registro fechado."""
+        registro = {'geracao': geracao, 'tempos': self.tempos, 'contadores': self.contadores}
+        self.qtd_geracoes += 1
+        self.ultima_geracao = registro
+
+        for fase, segundos in self.tempos.items():
+            self.tempos_totais[fase] = self.tempos_totais.get(fase, 0.0) + segundos
+        for nome, quantidade in self.contadores.items():
+            self.contadores_totais[nome] = self.contadores_totais.get(nome, 0) + quantidade
+        self.tempos = {}
+        self.contadores = {}
+
+        if self.arquivo is not None:
+            if isinstance(self.arquivo, str):
+                if self._arquivo_aberto is None:
+                    self._arquivo_aberto = open(self.arquivo, 'a')
+                saida = self._arquivo_aberto
+            else:
+                saida = self.arquivo
+            saida.write(json.dumps(registro) + "\n")
+            saida.flush()
+
+        return registro
+
+    @property
+    def resumo(self) -> dict:
+        """Os tempos e contadores somados de todas as gerações fechadas."""
+        return {'geracoes': self.qtd_geracoes, 'tempos': dict(self.tempos_totais),
+                'contadores': dict(self.contadores_totais)}
+
+
+"""MOTOR"""
+
+
+class AlgoritmoGenetico:
+    """
+    Executa o algoritmo genético para uma classe herdeira de Cromossomo: gera a população inicial e,
+    a cada geração, seleciona, reproduz e mutaciona.
+
+    A população é avaliada uma única vez por geração, e as aptidões ficam guardadas em self.aptidoes
+    (na mesma ordem de self.populacao). A seleção e a escolha dos pais trabalham em cima dos índices
+    da população, consultando essas aptidões, então cada novo indivíduo é avaliado só uma vez.
+
+    Com usar_lote=True e uma classe que implemente o protocolo de lote (veja Cromossomo.suporta_lote), a população
+    é um array (tam_populacao, qtd_genes) e cada etapa da geração é feita com operações de array.
+    Senão, a população é uma lista de cromossomos.
+    """
+
+    def __init__(self, classe_cromossomo: type, tam_populacao: int = 12, qtd_selecionados: int = 5,
+                 num_geracoes: int = 25, selecao: Selecoes = Selecoes.ROLETA, reproducao: Reproducoes = 0,
+                 chance_mutacao: float = 0.03, objetivo: Objetivos = Objetivos.MINIMIZAR, verboso: bool = False,
+                 semente: int = None, tamanho_torneio: int = 3, num_processos: int = 1,
+                 tamanho_lote: int = None, usar_lote: bool = False, instrumentacao: Instrumentacao = None,
+                 criterios_parada: CriteriosParada = None, arquivo_checkpoint: str = None,
+                 intervalo_checkpoint: int = 10, avaliador_assincrono: AvaliadorAssincrono = None):
+        """
+        reproducao = 0 significa o método de reprodução "default" da classe (classe_cromossomo.reproduzir).
+        Se verboso for True, o número de cada geração é impresso.
+        A semente inicializa o gerador de números aleatórios usado na seleção (self.gerador).
+        tamanho_torneio é a quantidade de candidatos de cada torneio, tanto na seleção por torneio quanto
+        na escolha dos pais.
+        Se num_processos for maior que 1 (ou None, para usar todos os processadores), a população é avaliada
+        em paralelo (veja AvaliadorParalelo), em lotes de tamanho_lote cromossomos.
+        Com usar_lote, o protocolo de lote da classe é usado (veja Cromossomo.suporta_lote).
+        No modo lote, a avaliação já é vetorizada e num_processos é ignorado.
+        Com uma instrumentacao, o tempo de cada fase de cada geração e os contadores dos caminhos mais usados
+        são registrados nela (veja Instrumentacao).
+        Com criterios_parada, executar pode parar antes de num_geracoes; o motivo fica em self.motivo_parada.
+        Com arquivo_checkpoint, o estado do algoritmo é salvo nele a cada intervalo_checkpoint gerações
+        (veja salvar_checkpoint), e a execução pode ser continuada depois com AlgoritmoGenetico.retomar.
+        Com um avaliador_assincrono, cada população é avaliada concorrentemente por ele (veja AvaliadorAssincrono),
+        no lugar da avaliação serial ou paralela.
+        """
+        if not issubclass(classe_cromossomo, Cromossomo):
+            raise Exception("A classe do cromossomo deve herdar de Cromossomo.")
+        if qtd_selecionados > tam_populacao:
+            raise Exception("Não dá para selecionar mais cromossomos do que o tamanho da população.")
+        if usar_lote and not classe_cromossomo.suporta_lote():
+            raise Exception("A classe %s não implementa o protocolo de lote." % classe_cromossomo.__name__)
+        if (usar_lote and reproducao == Reproducoes.CROSSOVER_1
+                and getattr(classe_cromossomo, 'reproduzir_crossover_1_lote', None) is None):
+            raise Exception("A classe %s não implementa reproduzir_crossover_1_lote." % classe_cromossomo.__name__)
+        if intervalo_checkpoint < 1:
+            raise Exception("O intervalo entre checkpoints deve ser de pelo menos uma geração.")
+        if avaliador_assincrono is not None and avaliador_assincrono.classe_cromossomo is not classe_cromossomo:
+            raise Exception("O avaliador assíncrono deve ser da mesma classe de cromossomo.")
+
+        self.classe_cromossomo = classe_cromossomo
+        self.tam_populacao = tam_populacao
+        self.qtd_selecionados = qtd_selecionados
+        self.num_geracoes = num_geracoes
+        self.selecao = selecao
+        self.reproducao = reproducao
+        self.chance_mutacao = chance_mutacao
+        self.objetivo = objetivo
+        self.verboso = verboso
+        self.tamanho_torneio = tamanho_torneio
+        self.num_processos = num_processos
+        self.tamanho_lote = tamanho_lote
+        self.gerador = np.random.default_rng(semente)
+        self.usar_lote = usar_lote
+        self.instrumentacao = instrumentacao
+        self.criterios_parada = criterios_parada
+        self.arquivo_checkpoint = arquivo_checkpoint
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self.avaliador_assincrono = avaliador_assincrono
+
+        # Thread que está gravando o último checkpoint, e o erro dela, se houver
+        self._gravacao_checkpoint = None
+        self._erro_checkpoint = None
+        # Setado ao executar:
+        self.motivo_parada = None
+        # Setados ao iniciar:
+        self.populacao = None
+        self.aptidoes = None
+        self.geracao = 0
+        # Quantas vezes classe_cromossomo.avaliar foi chamado
+        self.avaliacoes = 0
+        # Criado na primeira avaliação paralela
+        self.avaliador_paralelo = None
+
+    def avaliar_populacao(self, populacao: Union[List[Cromossomo], np.ndarray]) -> np.ndarray:
+        """Retorna o array de aptidões dos cromossomos (ou dos genes, no modo lote), avaliando cada um uma única vez."""
+        self.avaliacoes += len(populacao)
+        if self.instrumentacao is not None:
+            self.instrumentacao.contar('avaliar', len(populacao))
+
+        if self.usar_lote:
+            return np.asarray(self.classe_cromossomo.avaliar_lote(populacao), dtype=float)
+
+        if self.avaliador_assincrono is not None:
+            return np.array(self.avaliador_assincrono.avaliar(populacao), dtype=float)
+
+        if self.num_processos is not None and self.num_processos <= 1:
+            return np.array([self.classe_cromossomo.avaliar(cromossomo) for cromossomo in populacao], dtype=float)
+
+        if self.avaliador_paralelo is None:
+            self.avaliador_paralelo = AvaliadorParalelo(self.classe_cromossomo, self.num_processos, self.tamanho_lote)
+        return np.array(self.avaliador_paralelo.avaliar(populacao), dtype=float)
+
+    def encerrar(self, levantar_erro_checkpoint: bool = True):
+        """
+        Encerra os processos da avaliação paralela, se houver, desativa a instrumentação e espera o último
+        checkpoint ser gravado (veja aguardar_checkpoint).
+        """
+        if self.avaliador_paralelo is not None:
+            self.avaliador_paralelo.encerrar()
+            self.avaliador_paralelo = None
+        if self.instrumentacao is not None:
+            self.instrumentacao.desativar()
+        self.aguardar_checkpoint(levantar_erro_checkpoint)
+
+    def iniciar(self):
+        """Gera e avalia a população inicial."""
+        if self.instrumentacao is not None:
+            self.instrumentacao.ativar()
+            inicio = time.perf_counter()
+
+        if self.usar_lote:
+            self.populacao = self.classe_cromossomo.gerar_lote(self.tam_populacao, self.gerador)
+        else:
+            self.populacao = [self.classe_cromossomo.gerar() for _ in range(self.tam_populacao)]
+        self.aptidoes = self.avaliar_populacao(self.populacao)
+        self.geracao = 0
+
+        if self.instrumentacao is not None:
+            self.instrumentacao.adicionar_tempo('geracao', time.perf_counter() - inicio)
+            self.instrumentacao.fechar_geracao(self.geracao)
+
+    def selecionar(self) -> List[int]:
+        """Retorna os índices (em self.populacao) dos cromossomos que passaram pela seleção."""
+        if self.selecao in (Selecoes.ROLETA, Selecoes.AMOSTRAGEM_UNIVERSAL):
+            universal = self.selecao == Selecoes.AMOSTRAGEM_UNIVERSAL
+            return list(sortear_roleta_vetorizada(self.aptidoes, self.qtd_selecionados, self.objetivo,
+                                                  universal=universal, gerador=self.gerador))
+
+        if self.selecao == Selecoes.TORNEIO:
+            return list(sortear_torneio_vetorizado(self.aptidoes, self.qtd_selecionados, self.tamanho_torneio,
+                                                   self.objetivo, self.gerador))
+
+        # seleção completamente aleatória de qtd_selecionados entre os cromossomos
+        return list(self.gerador.integers(0, len(self.populacao), size=self.qtd_selecionados))
+
+    def reproduzir(self, indices_selecionados: List[int]) -> Union[List[Cromossomo], np.ndarray]:
+        """
+        Gera os filhos, escolhendo os pais por torneio entre os selecionados.
+
+        Os pais de todos os casais que faltam são sorteados numa única chamada de sortear_torneio_vetorizado.
+        No modo lote, todos os casais também se reproduzem numa única chamada de reproduzir_lote.
+        """
+        if self.reproducao == Reproducoes.CROSSOVER_1:
+            metodo_reproducao = 'reproduzir_crossover_1'
+        else:
+            # Chamo o método de reprodução default.
+            metodo_reproducao = 'reproduzir'
+
+        indices_selecionados = np.asarray(indices_selecionados)
+        aptidoes_selecionados = self.aptidoes[indices_selecionados]
+
+        if self.usar_lote:
+            metodo_reproducao = getattr(self.classe_cromossomo, metodo_reproducao + '_lote')
+
+            qtd_casais = -(-self.tam_populacao // 2)
+            pais = sortear_torneio_vetorizado(aptidoes_selecionados, 2 * qtd_casais, self.tamanho_torneio,
+                                              self.objetivo, self.gerador)
+            pais = indices_selecionados[pais]
+
+            filhos = metodo_reproducao(self.populacao[pais[0::2]], self.populacao[pais[1::2]], self.gerador)
+            return filhos[:self.tam_populacao]
+
+        metodo_reproducao = getattr(self.classe_cromossomo, metodo_reproducao)
+
+        cromossomos_filhos = []
+        while len(cromossomos_filhos) < self.tam_populacao:
+            # Cada casal costuma gerar dois filhos
+            qtd_casais = -(-(self.tam_populacao - len(cromossomos_filhos)) // 2)
+            pais = sortear_torneio_vetorizado(aptidoes_selecionados, 2 * qtd_casais, self.tamanho_torneio,
+                                              self.objetivo, self.gerador)
+            pais = indices_selecionados[pais]
+
+            for pai, mae in zip(pais[0::2], pais[1::2]):
+                cromossomos_filhos.extend(metodo_reproducao(self.populacao[pai], self.populacao[mae]))
+
+        # Com tam_populacao ímpar sobra um filho, que é descartado (como no modo lote)
+        return cromossomos_filhos[:self.tam_populacao]
+
+    def mutacionar(self, filhos: Union[List[Cromossomo], np.ndarray]) -> Union[List[Cromossomo], np.ndarray]:
+        """Chama a função mutacionar em cima de cada filho. Ela já gira o dado pra ver se a mutação acontece."""
+        if self.usar_lote:
+            return self.classe_cromossomo.mutacionar_lote(filhos, self.chance_mutacao, self.gerador)
+
+        return [self.classe_cromossomo.mutacionar(filho, self.chance_mutacao) for filho in filhos]
+
+    def proxima_geracao(self):
+        """Seleciona, reproduz e mutaciona a população atual, e avalia a nova população."""
+        if self.instrumentacao is not None:
+            self._proxima_geracao_instrumentada()
+        else:
+            indices_selecionados = self.selecionar()
+            filhos = self.reproduzir(indices_selecionados)
+            self.populacao = self.mutacionar(filhos)
+            self.aptidoes = self.avaliar_populacao(self.populacao)
+            self.geracao += 1
+
+        if self.arquivo_checkpoint is not None and self.geracao % self.intervalo_checkpoint == 0:
+            self.salvar_checkpoint()
+
+    def _proxima_geracao_instrumentada(self):
+        """O mesmo que proxima_geracao, medindo cada fase."""
+        instrumentacao = self.instrumentacao
+        instrumentacao.ativar()
+
+        with instrumentacao.medir('geracao'):
+            with instrumentacao.medir('selecao'):
+                indices_selecionados = self.selecionar()
+            with instrumentacao.medir('reproducao'):
+                filhos = self.reproduzir(indices_selecionados)
+            with instrumentacao.medir('mutacao'):
+                self.populacao = self.mutacionar(filhos)
+            with instrumentacao.medir('avaliacao'):
+                self.aptidoes = self.avaliar_populacao(self.populacao)
+        self.geracao += 1
+
+        instrumentacao.fechar_geracao(self.geracao)
+
+    def executar(self) -> List[Cromossomo]:
+        """
+        Roda as num_geracoes gerações (gerando a população inicial, se preciso) e retorna a população final.
+        Se algum dos criterios_parada for atingido antes, para ali. O motivo fica em self.motivo_parada.
+        """
+        for _ in self.geracoes():
+            pass
+
+        return self.cromossomos
+
+    def geracoes(self):
+        """
+        O mesmo que executar, mas como um gerador: depois da população inicial (se ela for gerada agora) e de
+        cada geração, entrega um registro pequeno com a geração, a melhor, a pior e a média das aptidões,
+        os genes do melhor cromossomo, quantas avaliações foram feitas até ali e quanto tempo a geração levou
+        (e o tempo de cada fase, se houver instrumentação).
+
+        Nada é acumulado entre as gerações, então dá para rodar por quanto tempo quiser. Quem consome
+        pode parar quando quiser; o algoritmo é encerrado do mesmo jeito.
+        """
+        self.motivo_parada = None
+        if self.criterios_parada is not None:
+            self.criterios_parada.iniciar()
+
+        try:
+            if self.populacao is None:
+                inicio = time.perf_counter()
+                self.iniciar()
+                yield self.registro_geracao(time.perf_counter() - inicio)
+
+            while self.geracao < self.num_geracoes:
+                self.motivo_parada = self.verificar_parada()
+                if self.motivo_parada is not None:
+                    break
+
+                if self.verboso:
+                    print(self.geracao)
+
+                inicio = time.perf_counter()
+                self.proxima_geracao()
+                yield self.registro_geracao(time.perf_counter() - inicio)
+            else:
+                self.motivo_parada = MotivosParada.LIMITE
+        finally:
+            # Se a execução já estiver saindo por um erro, um erro na gravação do checkpoint não pode escondê-lo.
+            # GeneratorExit só quer dizer que quem consumia parou
+            erro = sys.exc_info()[1]
+            self.encerrar(levantar_erro_checkpoint=erro is None or isinstance(erro, GeneratorExit))
+
+    def registro_geracao(self, tempo: float) -> dict:
+        """O registro que geracoes entrega para a geração atual, que levou tempo segundos."""
+        cromossomo, melhor_aptidao = self.melhor
+        if self.objetivo == Objetivos.MINIMIZAR:
+            pior_aptidao = float(np.max(self.aptidoes))
+        else:
+            pior_aptidao = float(np.min(self.aptidoes))
+
+        registro = {
+            'geracao': self.geracao,
+            'melhor_aptidao': melhor_aptidao,
+            'pior_aptidao': pior_aptidao,
+            'media_aptidao': float(np.mean(self.aptidoes)),
+            'melhor_genes': cromossomo.genes,
+            'avaliacoes': self.avaliacoes,
+            'tempo': tempo,
+        }
+        if self.instrumentacao is not None and self.instrumentacao.ultima_geracao is not None:
+            registro['tempos'] = self.instrumentacao.ultima_geracao['tempos']
+
+        return registro
+
+    def verificar_parada(self) -> Union[MotivosParada, None]:
+        """Consulta os criterios_parada com a população atual. Retorna o motivo para parar, ou None."""
+        if self.criterios_parada is None:
+            return None
+
+        diversidade = None
+        if self.criterios_parada.diversidade_minima is not None:
+            diversidade = self.diversidade()
+
+        if self.objetivo == Objetivos.MINIMIZAR:
+            melhor_aptidao = float(np.min(self.aptidoes))
+        else:
+            melhor_aptidao = float(np.max(self.aptidoes))
+
+        return self.criterios_parada.verificar(melhor_aptidao, self.avaliacoes, self.objetivo, diversidade)
+
+    def diversidade(self) -> float:
+        """A fração de genomas distintos na população atual."""
+        if self.usar_lote:
+            distintos = len(np.unique(self.populacao, axis=0))
+        else:
+            distintos = len({self.classe_cromossomo.chave_genes(cromossomo) for cromossomo in self.populacao})
+
+        return distintos / len(self.populacao)
+
+    """CHECKPOINTS"""
+
+    def parametros(self) -> dict:
+        """Os parâmetros de configuração do algoritmo, como passados para o __init__ (sem a semente)."""
+        return {
+            'classe_cromossomo': self.classe_cromossomo,
+            'tam_populacao': self.tam_populacao,
+            'qtd_selecionados': self.qtd_selecionados,
+            'num_geracoes': self.num_geracoes,
+            'selecao': self.selecao,
+            'reproducao': self.reproducao,
+            'chance_mutacao': self.chance_mutacao,
+            'objetivo': self.objetivo,
+            'verboso': self.verboso,
+            'tamanho_torneio': self.tamanho_torneio,
+            'num_processos': self.num_processos,
+            'tamanho_lote': self.tamanho_lote,
+            'usar_lote': self.usar_lote,
+            'criterios_parada': self.criterios_parada,
+            'arquivo_checkpoint': self.arquivo_checkpoint,
+            'intervalo_checkpoint': self.intervalo_checkpoint,
+            'avaliador_assincrono': self.avaliador_assincrono,
+        }
+
+    def estado(self) -> dict:
+        """
+        Uma cópia de tudo que é preciso para continuar a execução exatamente de onde ela está: os parâmetros,
+        a população, as aptidões, a geração, o contador de avaliações e o estado dos geradores de números
+        aleatórios (o do numpy, usado pelo motor, e o do random, usado pelas classes de cromossomo).
+
+        O estado compartilhado da classe (a planta do CromossomoPotencia, por exemplo) não entra: ele deve
+        ser montado de novo antes de retomar.
+        """
+        if self.usar_lote:
+            populacao = self.populacao.copy()
+        else:
+            # Os cromossomos não são alterados depois de criados, então basta copiar a lista
+            populacao = list(self.populacao)
+
+        return {
+            'parametros': self.parametros(),
+            'populacao': populacao,
+            'aptidoes': self.aptidoes.copy(),
+            'geracao': self.geracao,
+            'avaliacoes': self.avaliacoes,
+            'estado_gerador': self.gerador.bit_generator.state,
+            'estado_random': getstate(),
+        }
+
+    def salvar_checkpoint(self, arquivo: str = None):
+        """
+        Salva o estado atual (veja estado) em arquivo (por padrão, self.arquivo_checkpoint).
+
+        A cópia do estado é feita na hora, mas a gravação é feita numa thread, para não parar as gerações.
+        O arquivo é gravado com outro nome e renomeado no fim, então um checkpoint pela metade nunca
+        substitui o anterior. Se a gravação anterior ainda não terminou, esse checkpoint é pulado.
+        """
+        arquivo = arquivo or self.arquivo_checkpoint
+        if arquivo is None:
+            raise Exception("Informe o arquivo do checkpoint.")
+
+        if self._erro_checkpoint is not None:
+            erro, self._erro_checkpoint = self._erro_checkpoint, None
+            raise erro
+        if self._gravacao_checkpoint is not None and self._gravacao_checkpoint.is_alive():
+            return
+
+        self._gravacao_checkpoint = Thread(target=self._gravar_checkpoint, args=(self.estado(), arquivo),
+                                           daemon=True)
+        self._gravacao_checkpoint.start()
+
+    def _gravar_checkpoint(self, estado: dict, arquivo: str):
+        try:
+            temporario = arquivo + '.tmp'
+            with open(temporario, 'wb') as saida:
+                pickle.dump(estado, saida, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo)
+        except Exception as erro:
+            self._erro_checkpoint = erro
+
+    def aguardar_checkpoint(self, levantar_erro: bool = True):
+        """
+        Espera a gravação do último checkpoint terminar. Se ela falhou, levanta o erro; com levantar_erro
+        False, só o imprime na saída de erro.
+        """
+        if self._gravacao_checkpoint is not None:
+            self._gravacao_checkpoint.join()
+            self._gravacao_checkpoint = None
+
+        if self._erro_checkpoint is not None:
+            erro, self._erro_checkpoint = self._erro_checkpoint, None
+            if levantar_erro:
+                raise erro
+            print("Erro ao gravar o checkpoint: %r" % erro, file=sys.stderr)
+
+    def restaurar(self, estado: dict):
+        """Coloca o algoritmo no estado salvo (veja estado)."""
+        self.populacao = estado['populacao']
+        self.aptidoes = estado['aptidoes']
+        self.geracao = estado['geracao']
+        self.avaliacoes = estado['avaliacoes']
+        self.gerador.bit_generator.state = estado['estado_gerador']
+        setstate(estado['estado_random'])
+
+    @classmethod
+    def retomar(cls, arquivo: str, **alteracoes) -> 'AlgoritmoGenetico':
+        """
+        Cria um algoritmo a partir do checkpoint salvo em arquivo, pronto para continuar com executar.
+        Uma execução retomada gera exatamente as mesmas populações que a execução original geraria.
+        Os criterios_parada começam do zero (a paciência e o tempo são contados a partir da retomada).
+
+        alteracoes troca parâmetros salvos (por exemplo, num_geracoes, para rodar por mais tempo, ou
+        instrumentacao, que não é salva).
+        """
+        with open(arquivo, 'rb') as entrada:
+            estado = pickle.load(entrada)
+
+        parametros = dict(estado['parametros'], **alteracoes)
+        algoritmo = cls(parametros.pop('classe_cromossomo'), **parametros)
+        algoritmo.restaurar(estado)
+        return algoritmo
+
+    @property
+    def cromossomos(self) -> List[Cromossomo]:
+        """A população atual como uma lista de cromossomos (no modo lote, os objetos são criados agora)."""
+        if self.populacao is None:
+            return None
+        if self.usar_lote:
+            return self.classe_cromossomo.de_lote(self.populacao)
+        return self.populacao
+
+    def _indices_por_aptidao(self) -> np.ndarray:
+        """Índices da população, do mais apto para o menos apto."""
+        if self.objetivo == Objetivos.MINIMIZAR:
+            return np.argsort(self.aptidoes, kind='stable')
+        return np.argsort(-self.aptidoes, kind='stable')
+
+    def melhores(self, n: int):
+        """Retorna os n indivíduos mais aptos (como em self.populacao) e suas aptidões, do mais apto para o menos."""
+        indices = self._indices_por_aptidao()[:n]
+
+        if self.usar_lote:
+            return self.populacao[indices], self.aptidoes[indices]
+        return [self.populacao[i] for i in indices], self.aptidoes[indices]
+
+    def receber_migrantes(self, migrantes: Union[List[Cromossomo], np.ndarray], aptidoes: np.ndarray):
+        """
+        Coloca os migrantes (já avaliados) no lugar dos indivíduos menos aptos da população.
+        Se vierem mais migrantes do que cabem na população, só os mais aptos entram.
+        """
+        aptidoes = np.asarray(aptidoes, dtype=float)
+        if self.objetivo == Objetivos.MINIMIZAR:
+            ordem_migrantes = np.argsort(aptidoes, kind='stable')
+        else:
+            ordem_migrantes = np.argsort(-aptidoes, kind='stable')
+        ordem_migrantes = ordem_migrantes[:len(self.populacao)]
+
+        piores = self._indices_por_aptidao()[::-1][:len(ordem_migrantes)]
+        self.aptidoes[piores] = aptidoes[ordem_migrantes]
+
+        if self.usar_lote:
+            self.populacao[piores] = migrantes[ordem_migrantes]
+        else:
+            for indice, migrante in zip(piores, ordem_migrantes):
+                self.populacao[indice] = migrantes[migrante]
+
+    @property
+    def melhor(self):
+        """Retorna o cromossomo mais apto da população atual e sua aptidão."""
+        if self.objetivo == Objetivos.MINIMIZAR:
+            indice = int(np.argmin(self.aptidoes))
+        else:
+            indice = int(np.argmax(self.aptidoes))
+
+        if self.usar_lote:
+            return self.classe_cromossomo.de_lote(self.populacao[indice:indice + 1])[0], float(self.aptidoes[indice])
+        return self.populacao[indice], float(self.aptidoes[indice])
+
+
+"""MODELO DE ILHAS"""
+
+
+def _melhor_entre(melhor: Union[tuple, None], candidato: tuple, objetivo: Objetivos) -> tuple:
+    """Entre dois pares (cromossomo, aptidão), retorna o de melhor aptidão. melhor pode ser None."""
+    if melhor is None:
+        return candidato
+    if objetivo == Objetivos.MINIMIZAR and candidato[1] < melhor[1]:
+        return candidato
+    if objetivo == Objetivos.MAXIMIZAR and candidato[1] > melhor[1]:
+        return candidato
+    return melhor
+
+
+def _executar_ilha(conexao, classe_cromossomo: type, estado: dict, parametros: dict, semente: np.random.SeedSequence,
+                   qtd_migrantes: int):
+    """
+    Roda num processo separado: evolui uma população e conversa com o ModeloIlhas pela conexao.
+
+    Cada mensagem recebida é (geracoes, migrantes). A ilha recebe os migrantes, roda mais geracoes
+    gerações e responde com suas estatísticas, o melhor indivíduo que ela já teve e os seus qtd_migrantes
+    melhores. A mensagem None encerra a ilha, que responde com a sua população final, as aptidões e o
+    melhor indivíduo que ela já teve.
+
+    O melhor é acompanhado a cada geração, então um indivíduo que aparece e se perde entre duas migrações
+    também conta.
+    """
+    _inicializar_trabalhador(classe_cromossomo, estado)
+    # O random do Python também é usado por algumas classes de cromossomo
+    seed(int(semente.generate_state(1)[0]))
+
+    algoritmo = AlgoritmoGenetico(classe_cromossomo, semente=semente, **parametros)
+    algoritmo.iniciar()
+    melhor = algoritmo.melhor
+
+    while True:
+        mensagem = conexao.recv()
+        if mensagem is None:
+            conexao.send((algoritmo.cromossomos, algoritmo.aptidoes, melhor))
+            break
+
+        geracoes, migrantes = mensagem
+        if migrantes is not None:
+            algoritmo.receber_migrantes(*migrantes)
+
+        inicio = time.perf_counter()
+        alvo = min(algoritmo.geracao + geracoes, algoritmo.num_geracoes)
+        while algoritmo.geracao < alvo:
+            algoritmo.proxima_geracao()
+            melhor = _melhor_entre(melhor, algoritmo.melhor, algoritmo.objetivo)
+
+        estatisticas = {
+            'geracao': algoritmo.geracao,
+            'melhor_aptidao': algoritmo.melhor[1],
+            'media_aptidao': float(np.mean(algoritmo.aptidoes)),
+            'avaliacoes': algoritmo.avaliacoes,
+            'tempo': time.perf_counter() - inicio,
+        }
+        conexao.send((estatisticas, melhor, algoritmo.melhores(qtd_migrantes)))
+
+    conexao.close()
+
+
+class ModeloIlhas:
+    """
+    Roda várias populações independentes (ilhas), cada uma num processo, com o mesmo AlgoritmoGenetico.
+
+    A cada intervalo_migracao gerações, cada ilha manda seus qtd_migrantes melhores indivíduos para as
+    ilhas vizinhas (segundo a topologia), onde eles substituem os menos aptos. Entre as migrações, as ilhas
+    evoluem em paralelo, sem se comunicar.
+
+    O processo principal guarda as estatísticas de cada ilha (self.estatisticas, a cada migração), o melhor
+    indivíduo de cada ilha, em qualquer geração (self.melhores), e o melhor de todos (self.melhor).
+    """
+
+    def __init__(self, classe_cromossomo: type, num_ilhas: int = None, intervalo_migracao: int = 5,
+                 qtd_migrantes: int = 2, topologia: Topologias = Topologias.ANEL, semente: int = None,
+                 verboso: bool = False, **parametros):
+        """
+        num_ilhas = None usa a quantidade de processadores da máquina.
+        Os demais parametros (tam_populacao, num_geracoes, selecao, objetivo...) são repassados para o
+        AlgoritmoGenetico de cada ilha. Cada ilha tem a sua semente, derivada de semente.
+        Checkpoints, instrumentação e avaliação assíncrona são do processo de uma ilha só, e não podem ser
+        passados para as ilhas.
+        """
+        if not issubclass(classe_cromossomo, Cromossomo):
+            raise Exception("A classe do cromossomo deve herdar de Cromossomo.")
+        if intervalo_migracao < 1:
+            raise Exception("O intervalo de migração deve ser de pelo menos uma geração.")
+        for nome in ('semente', 'verboso', 'num_processos', 'arquivo_checkpoint', 'instrumentacao',
+                     'avaliador_assincrono'):
+            if nome in parametros:
+                raise Exception("O parâmetro %s não pode ser passado para as ilhas." % nome)
+
+        self.classe_cromossomo = classe_cromossomo
+        self.num_ilhas = num_ilhas or os.cpu_count() or 1
+        self.intervalo_migracao = intervalo_migracao
+        self.qtd_migrantes = qtd_migrantes
+        self.topologia = topologia
+        self.verboso = verboso
+        self.parametros = parametros
+        self.num_geracoes = parametros.get('num_geracoes', 25)
+        self.objetivo = parametros.get('objetivo', Objetivos.MINIMIZAR)
+        self.sementes = np.random.SeedSequence(semente).spawn(self.num_ilhas)
+
+        # Setados ao executar:
+        self.estatisticas = None
+        self.melhor = None
+        self.melhores = None
+        self.populacoes = None
+        self.aptidoes = None
+
+    def _destinos(self, ilha: int) -> List[int]:
+        """As ilhas que recebem os migrantes de ilha."""
+        if self.num_ilhas == 1:
+            return []
+        if self.topologia == Topologias.ANEL:
+            return [(ilha + 1) % self.num_ilhas]
+        return [destino for destino in range(self.num_ilhas) if destino != ilha]
+
+    @staticmethod
+    def _juntar(migracoes: list):
+        """Junta os (migrantes, aptidões) vindos de várias ilhas num só par."""
+        if not migracoes:
+            return None
+
+        aptidoes = np.concatenate([aptidoes for _, aptidoes in migracoes])
+        if isinstance(migracoes[0][0], np.ndarray):
+            return np.concatenate([migrantes for migrantes, _ in migracoes]), aptidoes
+        return [migrante for migrantes, _ in migracoes for migrante in migrantes], aptidoes
+
+    def _atualizar_melhor(self, ilha: int, melhor: tuple):
+        self.melhores[ilha] = _melhor_entre(self.melhores[ilha], melhor, self.objetivo)
+        self.melhor = _melhor_entre(self.melhor, melhor, self.objetivo)
+
+    def executar(self):
+        """
+        Roda todas as ilhas até num_geracoes e retorna o melhor cromossomo encontrado e sua aptidão.
+        O melhor de cada ilha fica em self.melhores. As populações finais de cada ilha ficam em self.populacoes (e as aptidões em self.aptidoes).
+        """
+        estado = self.classe_cromossomo.estado_compartilhado()
+        self.estatisticas = [[] for _ in range(self.num_ilhas)]
+        self.melhor = None
+        self.melhores = [None] * self.num_ilhas
+
+        conexoes = []
+        processos = []
+        try:
+            for ilha in range(self.num_ilhas):
+                conexao, conexao_ilha = Pipe()
+                processo = Process(
+                    target=_executar_ilha,
+                    args=(conexao_ilha, self.classe_cromossomo, estado, self.parametros, self.sementes[ilha],
+                          self.qtd_migrantes),
+                    daemon=True
+                )
+                processo.start()
+                conexao_ilha.close()
+                conexoes.append(conexao)
+                processos.append(processo)
+
+            chegadas = [None] * self.num_ilhas
+            geracao = 0
+            while geracao < self.num_geracoes:
+                for conexao, migrantes in zip(conexoes, chegadas):
+                    conexao.send((self.intervalo_migracao, migrantes))
+
+                migracoes = [[] for _ in range(self.num_ilhas)]
+                for ilha, conexao in enumerate(conexoes):
+                    estatisticas, melhor, migrantes = self._receber(conexao, ilha)
+                    self.estatisticas[ilha].append(estatisticas)
+                    self._atualizar_melhor(ilha, melhor)
+                    for destino in self._destinos(ilha):
+                        migracoes[destino].append(migrantes)
+
+                chegadas = [self._juntar(migracao) for migracao in migracoes]
+                geracao = min(geracao + self.intervalo_migracao, self.num_geracoes)
+
+                if self.verboso:
+                    print(geracao, self.melhor[1])
+
+            self.populacoes = []
+            self.aptidoes = []
+            for ilha, conexao in enumerate(conexoes):
+                conexao.send(None)
+                populacao, aptidoes, melhor = self._receber(conexao, ilha)
+                self._atualizar_melhor(ilha, melhor)
+                self.populacoes.append(populacao)
+                self.aptidoes.append(aptidoes)
+        finally:
+            for conexao in conexoes:
+                conexao.close()
+            for processo in processos:
+                processo.join(timeout=5)
+                if processo.is_alive():
+                    processo.terminate()
+
+        return self.melhor
+
+    @staticmethod
+    def _receber(conexao, ilha: int):
+        try:
+            return conexao.recv()
+        except EOFError:
+            raise Exception("A ilha %d terminou inesperadamente." % ilha)
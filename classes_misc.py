@@ -1,9 +1,56 @@
+from classes_ga import CacheLRU, Instrumentacao
 from collections import deque as fila
+from enum import Enum
+from shapely import wkb
 from shapely.geometry import MultiPoint, Polygon, Point, LineString
+from shapely.ops import polygonize, unary_union
+from shapely.prepared import prep
 from typing import Union, List
 from math import log10
 
+import hashlib
+import numpy as np
+import os
 import random
+import struct
+import time
+import zipfile
+
+try:
+    # shapely >= 2
+    from shapely import contains_xy as _contem_xy
+except ImportError:
+    try:
+        from shapely.vectorized import contains as _contem_xy
+    except (ImportError, ValueError):
+        # ValueError: o shapely.vectorized foi compilado com outra versão do numpy
+        _contem_xy = None
+
+
+"""ENUMERAÇÕES"""
+
+
+class BuscasPontos(Enum):
+    """
+    Formas de procurar os pontos internos da planta
+    """
+    # Pula de vizinho em vizinho a partir da origem
+    BFS = 1
+    # Monta a grade inteira sobre os limites da planta e testa todos os pontos de uma vez
+    VARREDURA = 2
+
+
+class Contornos(Enum):
+    """
+    Formas de montar o polígono da planta a partir das paredes
+    """
+    # Casca convexa das pontas das paredes
+    CONVEXO = 1
+    # Polígono (que pode ser côncavo) formado pelas próprias paredes, que precisam se fechar
+    PAREDES = 2
+
+
+"""FUNÇÕES"""
 
 
 def media(*numeros: Union[float, int]):
@@ -21,7 +68,7 @@ def ponto_aleatorio(poly: Polygon):
     (minx, miny, maxx, maxy) = poly.bounds
     while True:
         p = Ponto(random.uniform(minx, maxx), random.uniform(miny, maxy))
-        if poly.contains(p):
+        if poly.contains(p.geometria):
             return p
 
 
@@ -32,41 +79,285 @@ def distancia_entre_pontos(p1: 'Ponto', p2: 'Ponto'):
     return (abs(p1.x - p2.x)**2 + abs(p1.y - p2.y)**2) ** 0.5
 
 
+def contem_pontos(poligono: Polygon, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Retorna um array de booleanos dizendo quais pontos (x[i], y[i]) estão dentro do polígono.
+
+    Usa o teste vetorizado do shapely, se houver. Senão, testa um por um contra a geometria preparada.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    if _contem_xy is not None:
+        return np.asarray(_contem_xy(poligono, x, y), dtype=bool)
+
+    preparado = prep(poligono)
+    return np.array([preparado.contains(Point(px, py)) for px, py in zip(x.tolist(), y.tolist())], dtype=bool)
+
+
+def carregar_npz_mapeado(caminho: str) -> dict:
+    """
+    Abre um arquivo .npz sem compressão (como os gravados por numpy.savez) e retorna um dicionário com os
+    seus arrays mapeados em memória (numpy.memmap, só leitura), em vez de lidos para a RAM.
+
+    O numpy.load ignora mmap_mode em arquivos .npz. Mas, sem compressão, cada .npy dentro do zip fica
+    contíguo no arquivo, então basta achar onde começam os dados de cada um.
+    """
+    arrays = {}
+
+    with zipfile.ZipFile(caminho) as arquivo_zip, open(caminho, 'rb') as arquivo:
+        for info in arquivo_zip.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception("Só dá para mapear em memória arquivos .npz sem compressão.")
+
+            # O cabeçalho local do zip tem 30 bytes fixos, seguidos do nome e do campo extra
+            arquivo.seek(info.header_offset)
+            cabecalho = struct.unpack('<4s5H3I2H', arquivo.read(30))
+            arquivo.seek(info.header_offset + 30 + cabecalho[-2] + cabecalho[-1])
+
+            versao = np.lib.format.read_magic(arquivo)
+            if versao == (1, 0):
+                forma, ordem_fortran, dtype = np.lib.format.read_array_header_1_0(arquivo)
+            else:
+                forma, ordem_fortran, dtype = np.lib.format.read_array_header_2_0(arquivo)
+
+            nome = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+
+            if not forma or 0 in forma:
+                # Escalares e arrays vazios não dá (nem vale a pena) mapear
+                arrays[nome] = np.fromfile(arquivo, dtype=dtype, count=int(np.prod(forma))).reshape(forma)
+            else:
+                arrays[nome] = np.memmap(caminho, dtype=dtype, mode='r', offset=arquivo.tell(), shape=forma,
+                                         order='F' if ordem_fortran else 'C')
+
+    return arrays
+
+
 def line_intersection(line1, line2):
 
-    line1 = LineString([(line1[0].x, line1[0].y), (line1[1].x, line1[1].y)])
-    line2 = LineString([(line2[0].x, line2[0].y), (line2[1].x, line2[1].y)])
+    line1 = LineString([coordenadas(line1[0]), coordenadas(line1[1])])
+    line2 = LineString([coordenadas(line2[0]), coordenadas(line2[1])])
     return line1.intersection(line2)
 
 
-class Ponto(Point):
+def coordenadas(p: Union['Ponto', List[Union[float, int]]]):
+    """
+    Retorna a tupla (x, y) de um ponto, seja ele um objeto Ponto ou uma lista de coordenadas.
+    """
+    if isinstance(p, (Ponto, Point)):
+        return p.x, p.y
+    return float(p[0]), float(p[1])
+
+
+def _orientacao(ax, ay, bx, by, cx, cy):
+    """
+    Produto vetorial (b - a) x (c - a), elemento a elemento. O sinal diz se c está à esquerda (positivo),
+    à direita (negativo) ou em cima (zero) da reta que passa por a e b.
+    """
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+class MotorIntersecoes:
+    """
+    Conta quantas paredes são atravessadas por cada um de muitos raios (segmentos origem -> destino), de uma vez.
+
+    As paredes ficam num array (M, 4) de segmentos (x1, y1, x2, y2). Uma parede com mais de dois pontos vira
+    vários segmentos, mas conta como uma parede só para cada raio.
+
+    Como no line_intersection, encostar numa parede conta como atravessá-la, e segmentos de comprimento zero
+    não contam.
+
+    Para não testar todo raio contra toda parede, os raios são agrupados em blocos de destinos próximos. Primeiro,
+    a caixa (bounding box) de cada bloco é comparada com a caixa de cada parede; só nos pares que passam desse
+    filtro é que a caixa de cada raio é comparada com a da parede, e só então vêm os testes de orientação.
+    """
+
+    # Quantos raios, em média, ficam em cada bloco do primeiro filtro
+    raios_por_bloco = 64
+    # Limite de elementos das matrizes temporárias, para não estourar a memória com plantas muito grandes
+    limite_elementos = 1 << 22
+
+    def __init__(self, paredes: List[tuple]):
+        segmentos = []
+        ids_paredes = []
+        for id_parede, parede in enumerate(paredes):
+            pontos = [coordenadas(p) for p in parede]
+            for inicio, fim in zip(pontos[:-1], pontos[1:]):
+                if inicio == fim:
+                    # Segmento de comprimento zero não é linha, não bloqueia nada
+                    continue
+                segmentos.append(inicio + fim)
+                ids_paredes.append(id_parede)
+
+        self.qtd_paredes = len(paredes)
+        self.segmentos = np.array(segmentos, dtype=float).reshape(-1, 4)
+        self.ids_paredes = np.array(ids_paredes, dtype=np.intp)
+
+        # Segmentos de paredes que têm mais de um segmento
+        self.segmento_composto = np.bincount(self.ids_paredes, minlength=self.qtd_paredes)[self.ids_paredes] > 1
+
+        x1, y1, x2, y2 = self.segmentos.T
+        self.caixas = np.column_stack((np.minimum(x1, x2), np.minimum(y1, y2), np.maximum(x1, x2), np.maximum(y1, y2)))
+
+    def _agrupar_raios(self, destinos: np.ndarray):
+        """
+        Ordena os raios por célula de uma grade uniforme sobre os destinos, para que raios vizinhos fiquem
+        no mesmo bloco. Retorna a ordem e o início de cada bloco nessa ordem.
+        """
+        qtd_raios = len(destinos)
+        qtd_blocos = max(1, qtd_raios // self.raios_por_bloco)
+
+        minimos = destinos.min(axis=0)
+        extensao = np.maximum(destinos.max(axis=0) - minimos, 1e-12)
+        lado_celula = max(np.sqrt(extensao[0] * extensao[1] / qtd_blocos), extensao.max() / qtd_blocos)
+
+        celulas = np.floor((destinos - minimos) / lado_celula).astype(np.int64)
+        ids_celulas = celulas[:, 0] * (celulas[:, 1].max() + 1) + celulas[:, 1]
+
+        ordem = np.argsort(ids_celulas, kind='stable')
+        ids_ordenados = ids_celulas[ordem]
+        inicios = np.flatnonzero(np.r_[True, ids_ordenados[1:] != ids_ordenados[:-1]])
+        return ordem, inicios
+
+    def contar(self, origens: np.ndarray, destinos: np.ndarray) -> np.ndarray:
+        """
+        Recebe as origens e os destinos dos raios, arrays (R, 2). Se houver uma única origem, ela pode ser
+        passada como um array (2,).
+
+        Retorna um array (R,) com quantas paredes cada raio atravessa. Uma parede com vários segmentos conta
+        uma vez só por raio; como só os cruzamentos dessas paredes podem se repetir, só eles passam por np.unique.
+        """
+        destinos = np.asarray(destinos, dtype=float).reshape(-1, 2)
+        origens = np.broadcast_to(np.asarray(origens, dtype=float).reshape(-1, 2), destinos.shape)
+
+        qtd_raios = len(destinos)
+        contagem = np.zeros(qtd_raios, dtype=np.intp)
+        if qtd_raios == 0 or len(self.segmentos) == 0:
+            return contagem
+
+        """Caixas de cada raio e de cada bloco de raios"""
+        ordem, inicios = self._agrupar_raios(destinos)
+        origens = origens[ordem]
+        destinos = destinos[ordem]
+        caixas_raios = np.column_stack((np.minimum(origens, destinos), np.maximum(origens, destinos)))
+
+        caixas_blocos = np.column_stack((
+            np.minimum.reduceat(caixas_raios[:, :2], inicios),
+            np.maximum.reduceat(caixas_raios[:, 2:], inicios),
+        ))
+        tamanhos_blocos = np.diff(np.r_[inicios, qtd_raios])
+
+        """Primeiro filtro: blocos x paredes, em pedaços para limitar a memória"""
+        pares_raios = []
+        pares_segmentos = []
+        blocos_por_pedaco = max(1, self.limite_elementos // len(self.segmentos))
+
+        for primeiro in range(0, len(inicios), blocos_por_pedaco):
+            caixas = caixas_blocos[primeiro:primeiro + blocos_por_pedaco]
+            sobrepostos = (
+                (caixas[:, np.newaxis, 0] <= self.caixas[np.newaxis, :, 2]) &
+                (caixas[:, np.newaxis, 2] >= self.caixas[np.newaxis, :, 0]) &
+                (caixas[:, np.newaxis, 1] <= self.caixas[np.newaxis, :, 3]) &
+                (caixas[:, np.newaxis, 3] >= self.caixas[np.newaxis, :, 1])
+            )
+            blocos, segmentos = np.nonzero(sobrepostos)
+            if len(blocos) == 0:
+                continue
+            blocos += primeiro
+
+            # Cada par (bloco, segmento) vira um par (raio, segmento) para cada raio do bloco
+            repeticoes = tamanhos_blocos[blocos]
+            deslocamentos = np.arange(repeticoes.sum()) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+            raios = np.repeat(inicios[blocos], repeticoes) + deslocamentos
+            segmentos = np.repeat(segmentos, repeticoes)
+
+            """Segundo filtro: caixa de cada raio x caixa do segmento"""
+            caixas_r = caixas_raios[raios]
+            caixas_s = self.caixas[segmentos]
+            sobrepostos = (
+                (caixas_r[:, 0] <= caixas_s[:, 2]) & (caixas_r[:, 2] >= caixas_s[:, 0]) &
+                (caixas_r[:, 1] <= caixas_s[:, 3]) & (caixas_r[:, 3] >= caixas_s[:, 1])
+            )
+            pares_raios.append(raios[sobrepostos])
+            pares_segmentos.append(segmentos[sobrepostos])
+
+        if not pares_raios:
+            return contagem
+
+        raios = np.concatenate(pares_raios)
+        segmentos = np.concatenate(pares_segmentos)
+        if Instrumentacao.ativa is not None:
+            Instrumentacao.ativa.contar('testes_intersecao', len(raios))
+
+        """Testes de orientação: os segmentos se cruzam (ou se encostam) se cada um separa as pontas do outro"""
+        ox, oy = origens[raios].T
+        dx, dy = destinos[raios].T
+        x1, y1, x2, y2 = self.segmentos[segmentos].T
+
+        # Um raio de comprimento zero (destino em cima da origem) não atravessa nada
+        cruzam = ((ox != dx) | (oy != dy)) & (
+            (_orientacao(x1, y1, x2, y2, ox, oy) * _orientacao(x1, y1, x2, y2, dx, dy) <= 0) &
+            (_orientacao(ox, oy, dx, dy, x1, y1) * _orientacao(ox, oy, dx, dy, x2, y2) <= 0)
+        )
+
+        raios = raios[cruzam]
+        segmentos = segmentos[cruzam]
+
+        # Uma parede com vários segmentos só conta uma vez por raio. Só esses pares precisam de np.unique
+        compostos = self.segmento_composto[segmentos]
+        contagem_ordenada = np.bincount(raios[~compostos], minlength=qtd_raios)
+        if compostos.any():
+            pares = np.unique(raios[compostos] * self.qtd_paredes + self.ids_paredes[segmentos[compostos]])
+            contagem_ordenada += np.bincount(pares // self.qtd_paredes, minlength=qtd_raios)
+
+        contagem[ordem] = contagem_ordenada
+        return contagem
+
+
+class Ponto:
     """
-    Essa classe encapsula o comportamento de um ponto no plano cartesiano. Herda da classe
-    shapely.geometry.Point, acrescentando vizinhos e valor.
+    Essa classe encapsula o comportamento de um ponto no plano cartesiano, com vizinhos e valor.
 
-    Também acrescenta a possibilidade de o ponto ser usado como chave em um dicionário
-    ou item de um set.
+    É um objeto leve (usa __slots__), comparado e usado como chave de dicionário ou item de set pela tupla
+    de coordenadas. Quando for preciso fazer geometria de verdade com o shapely, use a propriedade geometria.
     """
-    _vizinhos = None
-    valor = None
+    __slots__ = ('x', 'y', '_vizinhos', '_planta', 'valor')
 
     def __init__(self, *args: Union[float, int]):
-        super().__init__(*args)
-        self._vizinhos = list()
+        """Aceita Ponto(x, y) ou Ponto((x, y))."""
+        if len(args) == 1:
+            args = args[0]
+        x, y = args[:2]
+
+        self.x = float(x)
+        self.y = float(y)
+        self._vizinhos = None
+        # A planta da qual o ponto é um ponto interno, se for
+        self._planta = None
+        self.valor = None
+
+    @property
+    def geometria(self) -> Point:
+        """Retorna o ponto como um shapely.geometry.Point."""
+        return Point(self.x, self.y)
 
     @property
     def vizinhos(self):
         """
         Retorna os vizinhos.
 
-        Para poder retornar os vizinhos, você deve ter antes chamado a função calcular_vizinhos, informando
-        a granularidade.
+        Os vizinhos de um ponto interno de uma planta são os de Planta.vizinhos_internos: só os pontos
+        internos da grade (cima, baixo, direita, esquerda). Para qualquer outro ponto, você deve ter antes
+        chamado a função calcular_vizinhos, informando a granularidade. Um ponto serializado (pickle) perde
+        a planta, e volta a precisar de calcular_vizinhos.
         """
-        if self._vizinhos is None:
-            raise Exception("Antes de tentar saber quais são os vizinhos, chame ponto.calcular_vizinhos\
-                informando a granularidade!")
+        if self._vizinhos is not None:
+            return self._vizinhos
+        if self._planta is not None:
+            return self._planta.vizinhos_internos(self)
 
-        return self._vizinhos
+        raise Exception("Antes de tentar saber quais são os vizinhos, chame ponto.calcular_vizinhos\
+            informando a granularidade!")
 
     def calcular_vizinhos(self, granularidade: float):
         """
@@ -84,16 +375,25 @@ class Ponto(Point):
 
         return self._vizinhos
 
+    def __eq__(self, outro):
+        if not isinstance(outro, Ponto):
+            return NotImplemented
+        return self.x == outro.x and self.y == outro.y
+
+    def __hash__(self):
+        """Serve para que o ponto possa ser usado como chave de dicionário ou de conjunto(set)."""
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        """Ao serializar (pickle), só as coordenadas vão junto."""
+        return Ponto, (self.x, self.y)
+
     def __str__(self):
-        return "(%s)" % ','.join(["%.2f" % x for x in self.coords[0]])
+        return "(%.2f,%.2f)" % (self.x, self.y)
 
     def __repr__(self):
         return self.__str__()
 
-    def __hash__(self):
-        """Serve para que o ponto possa ser usado como chave de dicionário ou de conjunto(set)."""
-        return hash(self.__str__())
-
 
 class Planta:
     """
@@ -108,6 +408,30 @@ class Planta:
     # Setados ao procurar os pontos internos (função procurar_pontos_internos):
     origem = None
     poligono = None
+    # Os pontos internos numa ordem fixa, suas coordenadas num array (N, 2), suas posições (i, j) na grade
+    # (quantas granularidades da origem, em x e em y) num array (N, 2) e o índice de cada posição (i, j) na lista:
+    lista_pontos_internos = None
+    coordenadas_internas = None
+    reticulado_internos = None
+    indices_reticulado = None
+    # Índices dos vizinhos internos de cada ponto, num array (N, 4), com -1 para vizinhos fora da planta:
+    vizinhanca = None
+
+    # Criado na primeira contagem de paredes (função contar_paredes):
+    motor_intersecoes = None
+    # Setada ao pré-calcular as atenuações (função precalcular_atenuacoes):
+    tabela_atenuacoes = None
+    # Setado quando procurar_pontos_internos usa um diretorio_cache: (caminho, busca, contorno) do arquivo da
+    # discretização. precalcular_atenuacoes salva a tabela nele:
+    arquivo_discretizacao = None
+    # Cache do sinal de cada fonte em todos os pontos internos, indexado pelo índice do ponto interno da fonte.
+    # Fica desligado até alguém chamar ativar_cache_campos:
+    cache_campos = None
+
+    # Parâmetros do cálculo de recepção do sinal (veja avaliar_recepcao_sinal)
+    potencia_transmissor = 20
+    ganho_antena = 5
+    atenuacao_parede = 4
 
     def __init__(self, granularidade: Union[float, int]):
         self.pontos_internos = set()
@@ -155,34 +479,279 @@ class Planta:
                         raise Exception("as coordenadas dos pontos precisam ser float ou int!")
 
         self.pontos_paredes.append(pontos)
+        # As paredes mudaram: o motor de interseções, a tabela de atenuações e os campos guardados
+        # precisam ser refeitos, e o arquivo da discretização não corresponde mais à planta
+        self.motor_intersecoes = None
+        self.tabela_atenuacoes = None
+        self.arquivo_discretizacao = None
+        self.limpar_cache_campos()
 
     def simular_fontes(self, *fontes: Ponto):
         """
         Avalia a intensidade do sinal em todos os pontos internos de acordo com as fontes informadas.
 
-        Obs: cada ponto irá guardar sua nova intensidade.
+        Obs: cada ponto irá guardar sua nova intensidade. Quem só precisa dos valores deve usar calcular_sinal,
+        que não mexe nos pontos.
         """
 
-        # Se algum dos itens abaixo for none, chamamos a função que os seta
+        # Setamos as fontes na propriedade da classe. Isso é pra que a função self.avaliar() possa
+        # consultar quais são as fontes!
+        self.fontes = fontes
+
+        valores = self.calcular_sinal(*fontes)
+
+        # As fontes não são avaliadas: ficam com o valor que tinham
+        for ponto, valor in zip(self.lista_pontos_internos, valores.tolist()):
+            if valor == valor:
+                ponto.valor = valor
+
+        return valores
 
-        checks = (self.pontos_internos, self.origem, self.poligono)
+    def _garantir_pontos_internos(self):
+        """Se algum dos itens necessários para a simulação for None, chamamos a função que os seta."""
+        checks = (self.coordenadas_internas, self.origem, self.poligono)
         if any([x is None for x in checks]):
             self.procurar_pontos_internos()
 
-        # Setamos as fontes na propriedade da classe. Isso é pra que a função self.avaliar() possa
-        # consultar quais são as fontes!
-        self.fontes = fontes
+    def _indexar_pontos_internos(self):
+        """
+        Guarda os pontos internos numa lista de ordem fixa (ordenada pelas coordenadas), e as suas coordenadas
+        num array contíguo (N, 2). É sobre esse array que os cálculos vetorizados são feitos.
 
-        # A função abaixo seta o valor de cada ponto de acordo com as fontes.
-        for ponto in self.pontos_internos:
-            if ponto in self.fontes:
-                continue
-            self.avaliar(ponto)
+        Também calcula a posição (i, j) de cada ponto na grade, relativa à origem, e um dicionário que leva
+        de (i, j) ao índice do ponto na lista. É isso que deixa encontrar com custo O(1).
+        """
+        lista_pontos_internos = sorted(self.pontos_internos, key=lambda p: (p.x, p.y))
+        coordenadas_internas = np.array([(p.x, p.y) for p in lista_pontos_internos], dtype=float).reshape(-1, 2)
+
+        origem = np.array([self.origem.x, self.origem.y])
+        reticulado = np.rint((coordenadas_internas - origem) / self.granularidade).astype(np.int64)
+
+        self._guardar_indices(lista_pontos_internos, coordenadas_internas, reticulado)
+
+    def _guardar_indices(self, lista_pontos_internos: List[Ponto], coordenadas_internas: np.ndarray,
+                         reticulado: np.ndarray, vizinhanca: np.ndarray = None):
+        # Assim, ponto.vizinhos de um ponto interno consulta vizinhos_internos
+        for ponto in lista_pontos_internos:
+            ponto._planta = self
+        self.lista_pontos_internos = lista_pontos_internos
+        self.coordenadas_internas = np.ascontiguousarray(coordenadas_internas, dtype=float)
+        self.reticulado_internos = reticulado
+        self.indices_reticulado = {
+            (i, j): indice for indice, (i, j) in enumerate(reticulado.tolist())
+        }
+        self.vizinhanca = vizinhanca if vizinhanca is not None else self._calcular_vizinhanca(reticulado)
+        # Os pontos mudaram: uma tabela de atenuações e os campos guardados antigos não valem mais
+        self.tabela_atenuacoes = None
+        self.limpar_cache_campos()
+
+    @staticmethod
+    def _calcular_vizinhanca(reticulado: np.ndarray) -> np.ndarray:
+        """
+        Retorna um array (N, 4) com o índice dos vizinhos internos de cada ponto (cima, baixo, direita,
+        esquerda), ou -1 onde o vizinho cairia fora da planta.
+
+        Cada posição (i, j) vira uma chave inteira, e os vizinhos são achados por busca binária nas chaves.
+        """
+        vizinhanca = np.full((len(reticulado), 4), -1, dtype=np.int64)
+        if len(reticulado) == 0:
+            return vizinhanca
+
+        i = reticulado[:, 0] - reticulado[:, 0].min() + 1
+        j = reticulado[:, 1] - reticulado[:, 1].min() + 1
+        # A folga garante que j + 1 e j - 1 nunca caiam na linha de outro i
+        largura = j.max() + 2
+
+        chaves = i * largura + j
+        ordem = np.argsort(chaves)
+        chaves_ordenadas = chaves[ordem]
+
+        for coluna, deslocamento in enumerate((1, -1, largura, -largura)):
+            alvos = chaves + deslocamento
+            posicoes = np.minimum(np.searchsorted(chaves_ordenadas, alvos), len(chaves) - 1)
+            achou = chaves_ordenadas[posicoes] == alvos
+            vizinhanca[achou, coluna] = ordem[posicoes[achou]]
+
+        return vizinhanca
+
+    def contar_paredes(self, *fontes: Ponto) -> np.ndarray:
+        """
+        Retorna um array (k, N) com a quantidade de paredes que o sinal que sai de cada fonte atravessa até chegar
+        em cada ponto interno (na ordem de self.lista_pontos_internos).
+
+        Todos os raios de todas as fontes são testados de uma vez, pelo MotorIntersecoes.
+        """
+        self._garantir_pontos_internos()
+        return self._contar_paredes(np.array([coordenadas(f) for f in fontes], dtype=float).reshape(-1, 2))
+
+    def _contar_paredes(self, coordenadas_fontes: np.ndarray) -> np.ndarray:
+        if self.motor_intersecoes is None:
+            self.motor_intersecoes = MotorIntersecoes(self.pontos_paredes)
+
+        qtd_pontos = len(self.coordenadas_internas)
+        origens = np.repeat(coordenadas_fontes, qtd_pontos, axis=0)
+        destinos = np.tile(self.coordenadas_internas, (len(coordenadas_fontes), 1))
+
+        return self.motor_intersecoes.contar(origens, destinos).reshape(len(coordenadas_fontes), qtd_pontos)
+
+    def calcular_campos(self, *fontes: Ponto) -> np.ndarray:
+        """
+        Calcula, de uma vez só, a recepção do sinal de cada fonte em todos os pontos internos.
+        Usa a mesma fórmula de avaliar_recepcao_sinal.
+
+        Retorna um array (k, N): a linha i tem o valor do sinal da fonte i em cada ponto interno (na ordem de
+        self.lista_pontos_internos). O ponto onde está a fonte fica com NaN, porque não é avaliado.
+
+        Se a tabela de atenuações tiver sido pré-calculada (precalcular_atenuacoes) e todas as fontes forem
+        pontos internos, as linhas são só copiadas da tabela.
+        Senão, se o cache de campos estiver ativo (ativar_cache_campos), só são calculadas as linhas das fontes
+        que ainda não estão no cache. Assim, um cromossomo que difere do pai por uma fonte só custa um campo novo.
+        """
+        instrumentacao = Instrumentacao.ativa
+        if instrumentacao is None:
+            return self._calcular_campos_das_fontes(fontes)
+
+        inicio = time.perf_counter()
+        campos = self._calcular_campos_das_fontes(fontes)
+        instrumentacao.adicionar_tempo('calcular_campos', time.perf_counter() - inicio)
+        instrumentacao.contar('calcular_campos')
+        return campos
+
+    def _calcular_campos_das_fontes(self, fontes) -> np.ndarray:
+        self._garantir_pontos_internos()
+
+        if self.tabela_atenuacoes is not None:
+            indices = [self.indice_interno(f) for f in fontes]
+            if None not in indices:
+                return np.asarray(self.tabela_atenuacoes[indices], dtype=float)
+
+        coordenadas_fontes = np.array([coordenadas(f) for f in fontes], dtype=float).reshape(-1, 2)
+
+        if self.cache_campos is None:
+            return self._calcular_campos(coordenadas_fontes)
+
+        campos = np.empty((len(coordenadas_fontes), len(self.coordenadas_internas)))
+        faltando = []
+        for linha, fonte in enumerate(fontes):
+            indice = self.indice_interno(fonte)
+            campo = None if indice is None else self.cache_campos.buscar(indice)
+            if campo is None:
+                faltando.append((linha, indice))
+            else:
+                campos[linha] = campo
+
+        if faltando:
+            linhas = [linha for linha, _ in faltando]
+            campos[linhas] = self._calcular_campos(coordenadas_fontes[linhas])
+            for linha, indice in faltando:
+                # Fontes fora da grade não são guardadas: a chave do cache é o índice do ponto interno
+                if indice is not None:
+                    self.cache_campos.guardar(indice, campos[linha].copy())
+
+        return campos
+
+    def _calcular_campos(self, coordenadas_fontes: np.ndarray) -> np.ndarray:
+        # Distância de cada fonte (linhas) até cada ponto interno (colunas)
+        diferencas = self.coordenadas_internas[np.newaxis, :, :] - coordenadas_fontes[:, np.newaxis, :]
+        distancias = np.hypot(diferencas[..., 0], diferencas[..., 1])
+
+        qtd_paredes = self._contar_paredes(coordenadas_fontes)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            atenuacao_propagacao = 40.2 + 10 * np.log10(distancias)
+            campos = np.abs(self.potencia_transmissor + self.ganho_antena - atenuacao_propagacao
+                            - qtd_paredes * self.atenuacao_parede)
+
+        campos[distancias == 0] = np.nan
+        return campos
 
-    def procurar_pontos_internos(self):
+    def precalcular_atenuacoes(self, arquivo: str = None, tamanho_bloco: int = 256, dtype=np.float64):
         """
-        Escolhe um ponto de partida (ou seja, uma origem) e vai pulando de vizinho em vizinho até
-        encontrar todos os pontos que estão dentro da planta. Se parece com um Breadth-First-Search.
+        As fontes dos cromossomos sempre caem em pontos internos, então o sinal de cada fonte possível em cada
+        ponto interno pode ser calculado uma vez só. Essa função monta essa tabela (N, N): a linha i é o que
+        calcular_campos retornaria para uma fonte no ponto self.lista_pontos_internos[i].
+
+        A tabela é calculada em blocos de tamanho_bloco fontes. Se arquivo for informado, ela é gravada num
+        arquivo .npy mapeado em memória, e não precisa caber na RAM. Usar dtype=np.float32 corta o tamanho
+        pela metade, com alguma perda de precisão.
+
+        Se a discretização tiver vindo de um diretorio_cache (ver procurar_pontos_internos), ela é salva de novo,
+        agora com a tabela, para que as próximas execuções não precisem recalculá-la.
+
+        Retorna a tabela, que também fica em self.tabela_atenuacoes.
+        """
+        self._garantir_pontos_internos()
+
+        qtd_pontos = len(self.coordenadas_internas)
+        forma = (qtd_pontos, qtd_pontos)
+
+        if arquivo is None:
+            tabela = np.empty(forma, dtype=dtype)
+        else:
+            tabela = np.lib.format.open_memmap(arquivo, mode='w+', dtype=dtype, shape=forma)
+
+        # Enquanto a tabela não estiver completa, calcular_campos não pode usá-la
+        self.tabela_atenuacoes = None
+        for inicio in range(0, qtd_pontos, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, qtd_pontos)
+            tabela[inicio:fim] = self._calcular_campos(self.coordenadas_internas[inicio:fim])
+
+        if arquivo is not None:
+            tabela.flush()
+
+        self.tabela_atenuacoes = tabela
+        if self.arquivo_discretizacao is not None:
+            self.salvar_discretizacao(*self.arquivo_discretizacao)
+        return tabela
+
+    def calcular_sinal(self, *fontes: Ponto) -> np.ndarray:
+        """
+        Retorna um array com o valor do sinal em cada ponto interno (na ordem de self.lista_pontos_internos),
+        sem mexer nos pontos.
+
+        Com várias fontes, cada ponto fica com o sinal da melhor fonte para ele, que é a de menor valor.
+        Os pontos onde estão as fontes ficam com NaN.
+        """
+        campos = self.calcular_campos(*fontes)
+
+        # O NaN de um ponto que é fonte deve prevalecer sobre o sinal das outras fontes
+        sinal = np.min(campos, axis=0)
+        return sinal
+
+    def pior_sinal(self, *fontes: Ponto) -> float:
+        """
+        Retorna o pior sinal (o maior valor) dentre os pontos internos, considerando a melhor fonte para
+        cada ponto. Os pontos onde estão as fontes são pulados.
+        """
+        return float(np.nanmax(self.calcular_sinal(*fontes)))
+
+    def ativar_cache_campos(self, tamanho_maximo: int = 256):
+        """
+        Liga o cache dos campos calculados por calcular_campos, guardando até tamanho_maximo campos
+        (cada um é um array de N floats). O cache é esvaziado sempre que as paredes ou os pontos mudam.
+        """
+        self.cache_campos = CacheLRU(tamanho_maximo)
+
+    def desativar_cache_campos(self):
+        """Desliga e descarta o cache de campos."""
+        self.cache_campos = None
+
+    def limpar_cache_campos(self):
+        """Esvazia o cache de campos, se ele estiver ativo."""
+        if self.cache_campos is not None:
+            self.cache_campos.limpar()
+
+    def estatisticas_cache_campos(self) -> Union[dict, None]:
+        """Retorna os acertos, falhas e tamanho do cache de campos, ou None se o cache estiver desligado."""
+        if self.cache_campos is None:
+            return None
+        return self.cache_campos.estatisticas
+
+    def procurar_pontos_internos(self, busca: BuscasPontos = BuscasPontos.BFS,
+                                 contorno: Contornos = Contornos.CONVEXO, diretorio_cache: str = None):
+        """
+        Escolhe um ponto de partida (ou seja, uma origem) e encontra todos os pontos da grade que estão
+        dentro da planta.
 
         - A escolha da origem é assim: primeiro vejo se o ponto exatamente no meio dos limites da planta
         está dentro da planta.
@@ -190,21 +759,37 @@ class Planta:
         Se não tiver, eu vou gerar pontos aleatórios dentro dos limites da planta até um cair
         dentro da planta.
 
-        - Esta é a função que gera o polígono da planta. O polígono é construído com base nas pontas
-        das paredes. Também, o polígono é o que usamos pra dizer se um ponto está dentro ou fora
-        da planta.
+        - Esta é a função que gera o polígono da planta. Com contorno = CONVEXO, o polígono é a casca convexa
+        das pontas das paredes. Com contorno = PAREDES, o polígono é formado pelas próprias paredes, e pode
+        ser côncavo. O polígono é o que usamos pra dizer se um ponto está dentro ou fora da planta.
+
+        - Com busca = BFS, vou pulando de vizinho em vizinho a partir da origem (ver _buscar_bfs).
+        Com busca = VARREDURA, testo de uma vez a grade inteira sobre os limites do polígono (ver _buscar_varredura).
+        A varredura também acha pedaços da planta que não se ligam à origem.
+
+        - Se diretorio_cache for informado, a discretização é procurada lá antes de ser calculada, num arquivo
+        com o nome dado por chave_discretizacao. Se não estiver lá, ela é calculada e salva (ver
+        salvar_discretizacao), para que as próximas execuções com a mesma planta comecem bem mais rápido.
+        Uma tabela de atenuações pré-calculada depois disso também é salva nesse arquivo.
         """
+        if diretorio_cache is not None:
+            caminho = os.path.join(diretorio_cache, "planta_%s.npz" % self.chave_discretizacao(busca, contorno))
+            if os.path.exists(caminho):
+                self.carregar_discretizacao(caminho, busca, contorno)
+            else:
+                self.procurar_pontos_internos(busca, contorno)
+                os.makedirs(diretorio_cache, exist_ok=True)
+                self.salvar_discretizacao(caminho, busca, contorno)
+
+            self.arquivo_discretizacao = (caminho, busca, contorno)
+            return
+
+        self.arquivo_discretizacao = None
 
         """
         SETANDO POLÍGONO DA PLANTA
         """
-        # Pegando todos os pontos de todas paredes
-        pontos_paredes = []
-        for parede in self.pontos_paredes:
-            pontos_paredes.extend(parede)
-
-        # Pegando a casca convexa que é formada por esses pontos, e formando o polígono
-        self.poligono = MultiPoint(pontos_paredes).convex_hull
+        self.poligono = self._montar_poligono(contorno)
 
         """
         ACHANDO A ORIGEM
@@ -218,37 +803,189 @@ class Planta:
         ]
         origem = Ponto(*origem)
 
-        if self.poligono.contains(origem):
+        if self.poligono.contains(origem.geometria):
             self.origem = origem
 
         else:
             self.origem = ponto_aleatorio(self.poligono)
 
-        # Eu considero a origem como ponto interno!
-        self.pontos_internos.add(self.origem)
+        """
+        BUSCANDO TODOS PONTOS DA GRADE DENTRO DO POLÍGONO
+        """
+        if busca == BuscasPontos.VARREDURA:
+            self._buscar_varredura()
+        else:
+            self._buscar_bfs()
 
+    def _montar_poligono(self, contorno: Contornos) -> Polygon:
+        # Pegando todos os pontos de todas paredes
+        pontos_paredes = []
+        for parede in self.pontos_paredes:
+            pontos_paredes.extend(coordenadas(p) for p in parede)
+
+        if contorno != Contornos.PAREDES:
+            # Pegando a casca convexa que é formada por esses pontos, e formando o polígono
+            return MultiPoint(pontos_paredes).convex_hull
+
+        # Juntando as paredes (e quebrando-as onde se cruzam) para achar as áreas que elas fecham
+        linhas = unary_union([LineString([coordenadas(p) for p in parede]) for parede in self.pontos_paredes])
+        poligonos = list(polygonize(linhas))
+
+        if not poligonos:
+            raise Exception("As paredes não fecham nenhuma área. Use o contorno CONVEXO ou feche as paredes.")
+
+        return unary_union(poligonos)
+
+    def _buscar_bfs(self):
         """
-        BUSCANDO TODOS PONTOS EM TORNO DA ORIGEM, DENTRO DO POLÍGONO
+        Vai pulando de vizinho em vizinho, a partir da origem, até encontrar todos os pontos que estão
+        dentro da planta. Se parece com um Breadth-First-Search.
+
+        A busca anda pela grade usando as posições inteiras (i, j) relativas à origem, e cada posição é
+        testada uma única vez. Só os pontos internos viram objetos Ponto.
         """
-        self.origem.calcular_vizinhos(self.granularidade)
-        fifo = fila(self.origem.vizinhos)
+        # Eu considero a origem como ponto interno!
+        self.pontos_internos = {self.origem}
+
+        visitados = {(0, 0)}
+        fifo = fila([(0, 0)])
 
         while fifo:
-            novo_ponto = fifo.popleft()
+            i, j = fifo.popleft()
 
-            if not self.poligono.contains(novo_ponto):
-                # Se o ponto atual está fora da planta, ignore-o
-                continue
+            for vizinho in ((i, j + 1), (i, j - 1), (i + 1, j), (i - 1, j)):
+                if vizinho in visitados:
+                    # Essa posição já foi testada, ignore-a
+                    continue
+                visitados.add(vizinho)
 
-            if novo_ponto in self.pontos_internos:
-                # Se o ponto atual está dentro da planta e já foi visitado, ignore-o
-                continue
+                novo_ponto = Ponto(
+                    self.origem.x + vizinho[0] * self.granularidade,
+                    self.origem.y + vizinho[1] * self.granularidade
+                )
 
-            # Adiciono o ponto atual
-            self.pontos_internos.add(novo_ponto)
+                if not self.poligono.contains(novo_ponto.geometria):
+                    # Se o ponto está fora da planta, ignore-o
+                    continue
 
-            # Acrescento seus vizinhos na fila para serem verificados
-            fifo.extend(novo_ponto.calcular_vizinhos(self.granularidade))
+                # Adiciono o ponto, e ele entra na fila para ter seus vizinhos verificados
+                self.pontos_internos.add(novo_ponto)
+                fifo.append(vizinho)
+
+        self._indexar_pontos_internos()
+
+    def _buscar_varredura(self):
+        """
+        Monta, como arrays, todas as posições (i, j) da grade que caem dentro dos limites do polígono,
+        e testa todas de uma vez com contem_pontos.
+        """
+        minx, miny, maxx, maxy = self.poligono.bounds
+        g = self.granularidade
+
+        posicoes_i = np.arange(np.ceil((minx - self.origem.x) / g), np.floor((maxx - self.origem.x) / g) + 1)
+        posicoes_j = np.arange(np.ceil((miny - self.origem.y) / g), np.floor((maxy - self.origem.y) / g) + 1)
+
+        # Indexação 'ij': as posições já saem ordenadas por i e depois por j, que é a ordem das coordenadas
+        grade_i, grade_j = np.meshgrid(posicoes_i.astype(np.int64), posicoes_j.astype(np.int64), indexing='ij')
+        grade_i = grade_i.ravel()
+        grade_j = grade_j.ravel()
+
+        dentro = contem_pontos(self.poligono, self.origem.x + grade_i * g, self.origem.y + grade_j * g)
+
+        # Eu considero a origem como ponto interno!
+        dentro |= (grade_i == 0) & (grade_j == 0)
+
+        self._criar_pontos_internos(np.column_stack((grade_i[dentro], grade_j[dentro])))
+
+    def _criar_pontos_internos(self, reticulado: np.ndarray):
+        """
+        Cria os pontos internos a partir das suas posições (i, j) na grade, já ordenadas por i e depois por j.
+        """
+        reticulado = np.asarray(reticulado, dtype=np.int64).reshape(-1, 2)
+        coordenadas_internas = np.column_stack((
+            self.origem.x + reticulado[:, 0] * self.granularidade,
+            self.origem.y + reticulado[:, 1] * self.granularidade,
+        ))
+
+        self._montar_pontos_internos(coordenadas_internas, reticulado)
+
+    def _montar_pontos_internos(self, coordenadas_internas: np.ndarray, reticulado: np.ndarray,
+                                vizinhanca: np.ndarray = None):
+        """Cria um Ponto para cada coordenada. A posição (0, 0) usa o próprio objeto da origem."""
+        lista_pontos_internos = [Ponto(x, y) for x, y in coordenadas_internas.tolist()]
+
+        na_origem = np.flatnonzero((reticulado[:, 0] == 0) & (reticulado[:, 1] == 0))
+        if len(na_origem):
+            lista_pontos_internos[na_origem[0]] = self.origem
+
+        self.pontos_internos = set(lista_pontos_internos)
+        self._guardar_indices(lista_pontos_internos, coordenadas_internas, reticulado, vizinhanca)
+
+    def chave_discretizacao(self, busca: BuscasPontos = BuscasPontos.BFS,
+                            contorno: Contornos = Contornos.CONVEXO) -> str:
+        """
+        Retorna um hash das paredes, da granularidade, da forma de busca e dos parâmetros do sinal (que mudam
+        a tabela de atenuações), que identifica a discretização da planta.
+        """
+        resumo = hashlib.sha1()
+        resumo.update(repr((float(self.granularidade), busca.name, contorno.name, len(self.pontos_paredes),
+                            float(self.potencia_transmissor), float(self.ganho_antena),
+                            float(self.atenuacao_parede))).encode())
+
+        for parede in self.pontos_paredes:
+            resumo.update(np.array([coordenadas(p) for p in parede], dtype=float).tobytes())
+            resumo.update(b'|')
+
+        return resumo.hexdigest()
+
+    def salvar_discretizacao(self, caminho: str, busca: BuscasPontos = BuscasPontos.BFS,
+                             contorno: Contornos = Contornos.CONVEXO):
+        """
+        Salva num único arquivo .npz (sem compressão) tudo o que procurar_pontos_internos calcula: origem,
+        coordenadas e posições na grade dos pontos internos, vizinhança e polígono. Se a tabela de atenuações
+        tiver sido pré-calculada, ela vai junto.
+
+        busca e contorno devem ser os mesmos usados em procurar_pontos_internos: eles entram na chave gravada
+        no arquivo, que é conferida ao carregar.
+        """
+        self._garantir_pontos_internos()
+
+        arrays = {
+            'chave': np.array(self.chave_discretizacao(busca, contorno)),
+            'origem': np.array([self.origem.x, self.origem.y]),
+            'coordenadas_internas': self.coordenadas_internas,
+            'reticulado_internos': self.reticulado_internos,
+            'vizinhanca': self.vizinhanca,
+            'poligono': np.frombuffer(wkb.dumps(self.poligono), dtype=np.uint8),
+        }
+        if self.tabela_atenuacoes is not None:
+            arrays['tabela_atenuacoes'] = self.tabela_atenuacoes
+
+        # Grava num arquivo temporário e depois troca, para nunca deixar um arquivo pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            np.savez(arquivo, **arrays)
+        os.replace(temporario, caminho)
+
+    def carregar_discretizacao(self, caminho: str, busca: BuscasPontos = BuscasPontos.BFS,
+                               contorno: Contornos = Contornos.CONVEXO):
+        """
+        Carrega a discretização salva por salvar_discretizacao, em vez de calculá-la. Os arrays grandes
+        (como a tabela de atenuações) ficam mapeados em memória, e só são lidos do disco quando usados.
+
+        Se o arquivo tiver sido gerado para outras paredes, granularidade ou forma de busca, levanta exceção.
+        """
+        arrays = carregar_npz_mapeado(caminho)
+
+        if str(arrays['chave']) != self.chave_discretizacao(busca, contorno):
+            raise Exception("O arquivo %s não corresponde a esta planta." % caminho)
+
+        self.poligono = wkb.loads(bytes(arrays['poligono']))
+        self.origem = Ponto(*arrays['origem'].tolist())
+
+        self._montar_pontos_internos(np.asarray(arrays['coordenadas_internas']),
+                                     np.asarray(arrays['reticulado_internos']), arrays['vizinhanca'])
+        self.tabela_atenuacoes = arrays.get('tabela_atenuacoes')
 
     def encontrar(self, p: Union[Ponto, List[Union[float, int]]]):
         """
@@ -276,10 +1013,18 @@ class Planta:
                     raise Exception("As coordenadas do ponto precisam ser float ou int!")
             p = Ponto(*p)
 
-        # quantas "granularidades" inteiras temos da origem até o ponto, no eixo x?
-        delta_x = int((p.x - self.origem.x) / self.granularidade)
-        # quantas "granularidades" inteiras temos da origem até o ponto, no eixo y?
-        delta_y = int((p.y - self.origem.y) / self.granularidade)
+        if Instrumentacao.ativa is not None:
+            Instrumentacao.ativa.contar('encontrar')
+
+        # quantas "granularidades" inteiras temos da origem até o ponto, em cada eixo?
+        delta_x = self._granularidades_ate(p.x, self.origem.x)
+        delta_y = self._granularidades_ate(p.y, self.origem.y)
+
+        indice = self.indices_reticulado.get((delta_x, delta_y))
+        if indice is not None:
+            # Isso serve para retornar o mesmo objeto que tem dentro de pontos_internos,
+            # cujos vizinhos (ponto.vizinhos) vêm de vizinhos_internos
+            return self.lista_pontos_internos[indice]
 
         estimativa = [
             self.origem.x + delta_x * self.granularidade,
@@ -288,15 +1033,65 @@ class Planta:
 
         estimativa = Ponto(*estimativa)
 
-        if self.poligono.contains(estimativa):
-            for pi in self.pontos_internos:
-                if pi == estimativa:
-                    # Isso serve para retornar o mesmo objeto que tem dentro de pontos_internos,
-                    # para não perder a informação de vizinhos
-                    return pi
+        if self.poligono.contains(estimativa.geometria):
             return estimativa
         return None
 
+    def _granularidades_ate(self, coordenada: float, coordenada_origem: float) -> int:
+        """
+        Quantas granularidades inteiras cabem entre a origem e a coordenada, num eixo (truncando, como int()).
+        Se a coordenada estiver em cima da grade, a menos de erro de arredondamento, ela é arredondada para
+        a posição certa, em vez de cair na anterior.
+        """
+        passos = (coordenada - coordenada_origem) / self.granularidade
+        passos_arredondados = round(passos)
+
+        if abs(passos - passos_arredondados) < 1e-9:
+            return passos_arredondados
+        return int(passos)
+
+    def vizinhos_internos(self, p: Union[Ponto, List[Union[float, int]]]) -> List[Ponto]:
+        """
+        Retorna os pontos internos que são vizinhos de p na grade (cima, baixo, direita, esquerda).
+        Os vizinhos que cairiam fora da planta não entram na lista.
+        """
+        indice = self.indice_interno(p)
+        if indice is not None:
+            return [self.lista_pontos_internos[vizinho] for vizinho in self.vizinhanca[indice].tolist() if vizinho >= 0]
+
+        x, y = coordenadas(p)
+        i = round((x - self.origem.x) / self.granularidade)
+        j = round((y - self.origem.y) / self.granularidade)
+
+        vizinhos = []
+        for posicao in ((i, j + 1), (i, j - 1), (i + 1, j), (i - 1, j)):
+            indice = self.indices_reticulado.get(posicao)
+            if indice is not None:
+                vizinhos.append(self.lista_pontos_internos[indice])
+
+        return vizinhos
+
+    def indice_interno(self, p: Union[Ponto, List[Union[float, int]]]) -> Union[int, None]:
+        """
+        Retorna o índice, em self.lista_pontos_internos, do ponto interno que está nas coordenadas de p.
+        Se p não cair exatamente num ponto interno, retorna None.
+        """
+        x, y = coordenadas(p)
+        i = round((x - self.origem.x) / self.granularidade)
+        j = round((y - self.origem.y) / self.granularidade)
+
+        indice = self.indices_reticulado.get((i, j))
+        if indice is None:
+            return None
+
+        # Confere se p está mesmo em cima do ponto da grade, e não só perto dele
+        ponto = self.lista_pontos_internos[indice]
+        tolerancia = 1e-9 * self.granularidade
+        if abs(ponto.x - x) > tolerancia or abs(ponto.y - y) > tolerancia:
+            return None
+
+        return indice
+
     def avaliar(self, p: Ponto):
         """
         Essa função só serve para chamar para a função que vai realizar o cálculo.
@@ -357,9 +1152,9 @@ class Planta:
 
         atenuação parede externa: 18db
         """
-        potencia_transmissor = 20
-        ganho_antena = 5
-        atenuacao_parede = 4
+        potencia_transmissor = self.potencia_transmissor
+        ganho_antena = self.ganho_antena
+        atenuacao_parede = self.atenuacao_parede
         qtd_paredes = len(self.avaliar_perda_paredes(p))
         distancia_transmissor_receptor = distancia_entre_pontos(p, self.fontes[0])
         atenuacao_propagacao = 40.2 + 10*log10(distancia_transmissor_receptor)
@@ -1,5 +1,14 @@
 from tipos_cromossomos import *
 
+import os
+
+
+def formatar_genes(cromossomo: Cromossomo) -> str:
+    """Os genes de um CromossomoBinario são um inteiro: mostramos os bits, com num_bits dígitos."""
+    if isinstance(cromossomo, CromossomoBinario):
+        return cromossomo.bits(cromossomo.genes)
+    return str(cromossomo.genes)
+
 
 if __name__ == "__main__":
     """
@@ -18,14 +27,35 @@ if __name__ == "__main__":
     # Chance de mutação
     CHANCE_MUTACAO = 0.03
     # OBJETIVO = Objetivos.MINIMIZAR
+    # Quantas populações evoluem em paralelo (modelo de ilhas). Com 1, é uma população só
+    NUM_ILHAS = 1
+    # A cada quantas gerações as ilhas trocam indivíduos, e quantos
+    INTERVALO_MIGRACAO = 5
+    QTD_MIGRANTES = 2
+    # Para parar antes de NUM_GERACOES: gerações sem melhorar a melhor aptidão, e a aptidão que já basta (None desliga)
+    PACIENCIA = None
+    APTIDAO_ALVO = None
+    # Arquivo onde salvar o estado a cada INTERVALO_CHECKPOINT gerações (None desliga). Se ele já existir,
+    # a execução continua de onde o checkpoint parou
+    ARQUIVO_CHECKPOINT = None
+    INTERVALO_CHECKPOINT = 5
+    # Para medir o tempo de cada fase de cada geração, informe um arquivo (JSON lines). None desliga
+    ARQUIVO_INSTRUMENTACAO = None
     # Qual classe se responsabilizará pelo manuseio dos cromossomos
     classe_cromossomo = CromossomoPotencia
+    # Trata a população inteira como um array numpy. Só para classes com o protocolo de lote
+    # (CromossomoQuadratico, CromossomoQuadraticoDecimal, CromossomoCilindroParabolico)
+    USAR_LOTE = classe_cromossomo.suporta_lote()
 
     """
     SETUP DA CLASSE DE CROMOSSOMO
     """
     GRANULARIDADE_PLANTA = 4
     QUANTIDADE_ROTEADORES = 1
+    # Onde guardar a discretização da planta, para as próximas execuções começarem mais rápido (None desliga)
+    DIRETORIO_CACHE_PLANTA = ".cache_planta"
+    # Quantos campos de sinal (um por posição de roteador) a planta guarda para reaproveitar (None desliga)
+    TAMANHO_CACHE_CAMPOS = 256
     lado_quadrado = 20
 
     planta = Planta(GRANULARIDADE_PLANTA)
@@ -35,8 +65,10 @@ if __name__ == "__main__":
     planta.adicionar_parede(Ponto(lado_quadrado, 0), Ponto(0, 0))
     planta.adicionar_parede(Ponto(0, 0), Ponto(0, lado_quadrado))
 
-    planta.procurar_pontos_internos()
+    planta.procurar_pontos_internos(BuscasPontos.VARREDURA, diretorio_cache=DIRETORIO_CACHE_PLANTA)
     print("Temos %d pontos internos." % len(planta.pontos_internos))
+    if TAMANHO_CACHE_CAMPOS is not None:
+        planta.ativar_cache_campos(TAMANHO_CACHE_CAMPOS)
     CromossomoPotencia.planta = planta
     CromossomoPotencia.k = QUANTIDADE_ROTEADORES
 
@@ -44,44 +76,64 @@ if __name__ == "__main__":
     TRIAGEM / PROCESSO
     """
 
-    # Geramos TAM_POPULACAO cromossomos aleatoriamente
-    cromossomos = [classe_cromossomo.gerar() for x in range(TAM_POPULACAO)]
-
-    for _ in range(NUM_GERACOES):
-        print(_)
-        """Seleção"""
-        if SELECAO == Selecoes.ROLETA:
-            cromossomos_selecionados = sortear_roleta(cromossomos, classe_cromossomo.avaliar, QTD_SELECIONADOS)
-
-        elif SELECAO == Selecoes.TORNEIO:
-            cromossomos_selecionados = sortear_torneio(cromossomos, classe_cromossomo.avaliar, QTD_SELECIONADOS)
+    if NUM_ILHAS > 1:
+        ilhas = ModeloIlhas(
+            classe_cromossomo,
+            num_ilhas=NUM_ILHAS,
+            intervalo_migracao=INTERVALO_MIGRACAO,
+            qtd_migrantes=QTD_MIGRANTES,
+            verboso=True,
+            tam_populacao=TAM_POPULACAO,
+            qtd_selecionados=QTD_SELECIONADOS,
+            num_geracoes=NUM_GERACOES,
+            selecao=SELECAO,
+            reproducao=REPRODUCAO,
+            chance_mutacao=CHANCE_MUTACAO,
+            usar_lote=USAR_LOTE
+        )
+        cromossomo, aptidao = ilhas.executar()
 
+        for ilha, estatisticas in enumerate(ilhas.estatisticas):
+            print("Ilha %d: %s" % (ilha, estatisticas[-1]))
+        print("Melhor: %s (%.2f)" % (formatar_genes(cromossomo), aptidao))
+    else:
+        if ARQUIVO_CHECKPOINT is not None and os.path.exists(ARQUIVO_CHECKPOINT):
+            algoritmo = AlgoritmoGenetico.retomar(
+                ARQUIVO_CHECKPOINT,
+                instrumentacao=Instrumentacao(ARQUIVO_INSTRUMENTACAO) if ARQUIVO_INSTRUMENTACAO else None
+            )
+            print("Retomando da geração %d" % algoritmo.geracao)
         else:
-            # seleção completamente aleatória de QTD_SELECIONADOS entre os cromossomos
-            cromossomos_selecionados = choices(cromossomos, k=QTD_SELECIONADOS)
-
-        """Reprodução"""
+            algoritmo = AlgoritmoGenetico(
+                classe_cromossomo,
+                tam_populacao=TAM_POPULACAO,
+                qtd_selecionados=QTD_SELECIONADOS,
+                num_geracoes=NUM_GERACOES,
+                selecao=SELECAO,
+                reproducao=REPRODUCAO,
+                chance_mutacao=CHANCE_MUTACAO,
+                usar_lote=USAR_LOTE,
+                instrumentacao=Instrumentacao(ARQUIVO_INSTRUMENTACAO) if ARQUIVO_INSTRUMENTACAO else None,
+                criterios_parada=CriteriosParada(alvo=APTIDAO_ALVO, paciencia=PACIENCIA),
+                arquivo_checkpoint=ARQUIVO_CHECKPOINT,
+                intervalo_checkpoint=INTERVALO_CHECKPOINT
+            )
 
-        if REPRODUCAO == Reproducoes.CROSSOVER_1:
-            cromossomos_filhos = []
-            while len(cromossomos_filhos) < TAM_POPULACAO:
-                # Faço uma roleta pra pegar dois pais aleatórios para gerar os filhos
-                pais = sortear_torneio(cromossomos_selecionados, classe_cromossomo.avaliar, 2)
-                cromossomos_filhos.extend(classe_cromossomo.reproduzir_crossover_1(*pais))
-
-        else:
-            # Chamo o método de reprodução default.
-            cromossomos_filhos = []
-            while len(cromossomos_filhos) < TAM_POPULACAO:
-                # Faço uma roleta pra pegar dois pais aleatórios para gerar os filhos
-                pais = sortear_torneio(cromossomos_selecionados, classe_cromossomo.avaliar, 2)
-                cromossomos_filhos.extend(classe_cromossomo.reproduzir(*pais))
+        # Cada geração entrega um resumo, sem precisar guardar o histórico
+        for registro in algoritmo.geracoes():
+            print("Geração %d: melhor %.2f, média %.2f, pior %.2f (%.3fs)" % (
+                registro['geracao'], registro['melhor_aptidao'], registro['media_aptidao'],
+                registro['pior_aptidao'], registro['tempo']
+            ))
+        cromossomos = algoritmo.cromossomos
 
-        """Mutação"""
-        # chamamos a função mutacionar em cima de cada cromossomo que chegou até aqui.
-        # essa funço já se encarrega em girar o dado pra ver se vai acontecer a mutação
-        cromossomos = [classe_cromossomo.mutacionar(filho, CHANCE_MUTACAO) for filho in cromossomos_filhos]
+        # fora do laço principal, vou printar todos os cromossomos, mostrando o gene e a aptidão
+        # (as aptidões já foram calculadas pelo algoritmo, não precisamos reavaliar)
+        for cromossomo, aptidao in zip(cromossomos, algoritmo.aptidoes):
+            print("%s (%.2f)" % (formatar_genes(cromossomo), aptidao))
 
-    # fora do laço principal, vou printar todos os cromossomos, mostrando o gene e a aptidão
-    for cromossomo in cromossomos:
-        print(cromossomo)
+        print("Parada: %s, na geração %d" % (algoritmo.motivo_parada.name, algoritmo.geracao))
+        if planta.cache_campos is not None:
+            print("Cache de campos: %s" % planta.estatisticas_cache_campos())
+        if algoritmo.instrumentacao is not None:
+            print("Instrumentação: %s" % algoritmo.instrumentacao.resumo)
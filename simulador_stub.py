@@ -0,0 +1,35 @@
+"""
+Um simulador externo de mentira, para testar a avaliação assíncrona (veja CromossomoSimulador).
+
+Recebe x e y na linha de comando e imprime o valor de z = x^2 - 2 x y + 6 x + y^2 - 6 y, depois de esperar
+--atraso segundos, como se fosse uma simulação demorada. Com --chance-falha, às vezes termina com erro.
+
+    python simulador_stub.py 1.5 -2 --atraso 0.1
+"""
+from random import random
+
+import argparse
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de mentira da função do cilindro parabólico.")
+    parser.add_argument('x', type=float)
+    parser.add_argument('y', type=float)
+    parser.add_argument('--atraso', type=float, default=0.0, help="quantos segundos esperar antes de responder")
+    parser.add_argument('--chance-falha', type=float, default=0.0, help="chance de terminar com erro")
+    argumentos = parser.parse_args()
+
+    time.sleep(argumentos.atraso)
+
+    if random() < argumentos.chance_falha:
+        print("falha simulada", file=sys.stderr)
+        sys.exit(1)
+
+    x, y = argumentos.x, argumentos.y
+    print(repr(x**2 - 2*x*y + 6*x + y**2 - 6*y))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from math import exp
-from random import random, choice
+from random import Random, random, choice, getrandbits, getstate, seed, setstate
 from typing import Union, List
 
+from classes_ga import CriteriosParada, MotivosParada
+
+import hashlib
+import numpy as np
+import os
+
 
 class Solucao:
     """Classe base que abstrai os detalhes de um problema que será resolvido com Simulated Annealing.
+
+    A energia de cada solução é calculada uma vez só (por calcular_energia) e fica guardada. Atribuir um novo
+    valor descarta a energia guardada; se o valor for mutável, atribua um valor novo em vez de alterá-lo.
     """
 
-    valor = None
+    _valor = None
+    _energia = None
 
     def __init__(self, valor=None):
         self.valor = valor
 
+    @property
+    def valor(self):
+        return self._valor
+
+    @valor.setter
+    def valor(self, valor):
+        self._valor = valor
+        self._energia = None
+
     @staticmethod
     def gerar() -> 'Solucao':
         raise NotImplementedError
@@ -20,10 +41,46 @@ class Solucao:
     def vizinhos(self) -> List['Solucao']:
         raise NotImplementedError
 
+    def vizinho(self) -> 'Solucao':
+        """Sorteia um vizinho. As classes herdeiras podem gerar só ele, em vez da lista toda de vizinhos."""
+        return choice(self.vizinhos)
+
+    def calcular_energia(self) -> Union[int, float]:
+        raise NotImplementedError
+
     @property
     def energia(self) -> Union[int, float]:
+        if self._energia is None:
+            self._energia = self.calcular_energia()
+        return self._energia
+
+    """PROTOCOLO DE LOTE (opcional)
+
+    Uma classe herdeira pode implementar os métodos abaixo para que muitas cadeias andem juntas,
+    com os valores de todas elas num array numpy (uma linha, ou um elemento, por cadeia).
+    O Recozimento.executar_lote usa esse protocolo."""
+
+    @staticmethod
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Gera os valores de n soluções aleatoriamente"""
+        raise NotImplementedError
+
+    @staticmethod
+    def vizinhos_lote(valores: np.ndarray, gerador: np.random.Generator) -> np.ndarray:
+        """Sorteia um vizinho para cada valor"""
+        raise NotImplementedError
+
+    @staticmethod
+    def energia_lote(valores: np.ndarray) -> np.ndarray:
+        """Retorna um array com a energia de cada valor"""
         raise NotImplementedError
 
+    @classmethod
+    def suporta_lote(cls) -> bool:
+        """Diz se a classe implementa todo o protocolo de lote."""
+        metodos = ('gerar_lote', 'vizinhos_lote', 'energia_lote')
+        return all(getattr(cls, metodo) is not getattr(Solucao, metodo) for metodo in metodos)
+
     def __repr__(self):
         return "%s (%.1f)" % (self.valor, self.energia)
 
@@ -54,10 +111,34 @@ class SolucaoQuadratica(Solucao):
 
         return [SolucaoQuadratica(novo_valor_1), SolucaoQuadratica(novo_valor_2)]
 
-    @property
-    def energia(self):
+    def vizinho(self):
+        """O mesmo que sortear um dos vizinhos, mas criando uma solução só."""
+
+        variacao = 0.1 * random() * choice([1, -1])
+
+        return SolucaoQuadratica(self.valor + self.valor * variacao)
+
+    def calcular_energia(self):
         return self.valor ** 2
 
+    @staticmethod
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Geramos n números aleatórios entre -numero_maximo e +numero_maximo"""
+        numero_maximo = 63
+
+        return numero_maximo * gerador.uniform(-1, 1, size=n)
+
+    @staticmethod
+    def vizinhos_lote(valores: np.ndarray, gerador: np.random.Generator) -> np.ndarray:
+        """Cada valor vai para cima ou para baixo em até 10% dele mesmo, como em vizinhos."""
+        variacoes = 0.1 * gerador.random(len(valores)) * gerador.choice([1, -1], size=len(valores))
+
+        return valores + valores * variacoes
+
+    @staticmethod
+    def energia_lote(valores: np.ndarray) -> np.ndarray:
+        return valores ** 2
+
 
 
 def probabilidade_exponencial(temperatura, valor):
@@ -65,50 +146,365 @@ def probabilidade_exponencial(temperatura, valor):
     return exp(valor / (-1 * temperatura))
 
 
-if __name__ == "__main__":
+def passo_metropolis(solucao_atual: Solucao, temperatura: Union[int, float], verboso: bool = False) -> Solucao:
     """
-    CONFIGURAÇÕES
+    Sorteia um vizinho da solução atual e decide se ele a substitui, pelo critério de Metropolis.
+    Se verboso for True, o delta de energia é impresso.
     """
-    DECAIMENTO_TEMPERATURA = 0.99
-    TEMPERATURA_INICIAL = 30
-    TEMPERATURA_FINAL = 0
-    PASSOS_POR_TEMPERATURA = 3
-    LIMITE_ITERACOES = 1000
+    solucao_vizinha = solucao_atual.vizinho()
 
-    classe = SolucaoQuadratica
+    delta_energia = solucao_vizinha.energia - solucao_atual.energia
+    if verboso:
+        print("delta: ", delta_energia)
+
+    if delta_energia < 0:
+        return solucao_vizinha
+
+    elif probabilidade_exponencial(temperatura, delta_energia) > random():
+        return solucao_vizinha
 
+    return solucao_atual
+
+
+"""MOTOR"""
+
+
+def _derivar_semente(semente, *indices) -> int:
     """
-    START
+    Uma semente inteira de 64 bits derivada de semente (de qualquer tipo, como um int ou uma string) e dos
+    índices. Serve tanto para o random quanto para o numpy, que só aceita inteiros.
+    """
+    texto = "-".join(str(i) for i in (semente,) + indices)
+    return int.from_bytes(hashlib.sha256(texto.encode()).digest()[:8], 'little')
+
+
+@contextmanager
+def _semeado(semente, *indices):
     """
+    Semeia o random com uma semente derivada de semente e dos índices só durante o bloco with. Depois, o estado
+    anterior do random volta, então o processo que chamou não tem o seu random semeado de novo.
+    """
+    estado = getstate()
+    seed(_derivar_semente(semente, *indices))
+    try:
+        yield
+    finally:
+        setstate(estado)
 
-    temperatura = TEMPERATURA_INICIAL
 
-    solucao_atual = classe.gerar()
+def _executar_cadeia(recozimento: 'Recozimento', semente, cadeia: int):
+    with _semeado(semente, cadeia):
+        return recozimento.executar(), recozimento.motivo_parada
 
-    contador = 0
 
-    while temperatura > TEMPERATURA_FINAL:
+def _executar_replica(solucao: Solucao, temperatura: float, passos: int, semente, rodada: int, replica: int):
+    """Roda passos passos de Metropolis numa temperatura fixa. Retorna a solução final e a melhor encontrada."""
+    melhor = solucao
+    with _semeado(semente, rodada, replica):
+        for _ in range(passos):
+            solucao = passo_metropolis(solucao, temperatura)
+            if solucao.energia < melhor.energia:
+                melhor = solucao
 
-        for _ in range(PASSOS_POR_TEMPERATURA):
-            solucao_vizinha = choice(solucao_atual.vizinhos)
+    return solucao, melhor
 
-            delta_energia = solucao_vizinha.energia - solucao_atual.energia
-            print("delta: ", delta_energia)
 
-            if delta_energia < 0:
-                solucao_atual = solucao_vizinha
+class Recozimento:
+    """
+    Roda o simulated annealing sobre uma classe herdeira de Solucao.
 
-            elif probabilidade_exponencial(temperatura, delta_energia) > random():
-                solucao_atual = solucao_vizinha
+    Uma cadeia começa em temperatura_inicial e, a cada passos_por_temperatura passos de Metropolis,
+    multiplica a temperatura por decaimento_temperatura, até chegar em temperatura_final ou em
+    limite_iteracoes temperaturas. A melhor solução visitada fica em self.melhor.
 
-        temperatura = temperatura * DECAIMENTO_TEMPERATURA
+    Além de uma cadeia só (executar), dá para rodar várias cadeias independentes em paralelo
+    (executar_cadeias) ou várias réplicas em temperaturas fixas que trocam de estado entre si
+    (executar_tempera_paralela).
 
-        contador += 1
-        if contador >= LIMITE_ITERACOES:
-            break
+    Com criterios_parada, a execução pode parar antes do fim do resfriamento. Os critérios são consultados
+    uma vez por temperatura (ou por rodada de trocas), então a paciência é contada em temperaturas, e cada
+    energia calculada conta como uma avaliação. O motivo da parada fica em self.motivo_parada.
+    """
 
-    print("Solução: ", solucao_atual)
+    def __init__(self, classe_solucao: type, temperatura_inicial: Union[int, float] = 30,
+                 temperatura_final: Union[int, float] = 0, decaimento_temperatura: float = 0.99,
+                 passos_por_temperatura: int = 3, limite_iteracoes: int = 1000, semente=None,
+                 verboso: bool = False, criterios_parada: CriteriosParada = None):
+        """
+        Se semente for informada, as cadeias e réplicas são reprodutíveis (cada uma com uma semente derivada dela).
+        Sem semente, a semente das cadeias e réplicas é sorteada pelo random a cada execução.
+        O random de quem chama não é semeado de novo: cada cadeia ou réplica só usa sua semente enquanto roda.
+        Se verboso for True, cada delta de energia de executar é impresso.
+        """
+        if not issubclass(classe_solucao, Solucao):
+            raise Exception("A classe da solução deve herdar de Solucao.")
+        if not 0 < decaimento_temperatura < 1:
+            raise Exception("O decaimento da temperatura deve estar entre 0 e 1.")
+
+        self.classe_solucao = classe_solucao
+        self.temperatura_inicial = temperatura_inicial
+        self.temperatura_final = temperatura_final
+        self.decaimento_temperatura = decaimento_temperatura
+        self.passos_por_temperatura = passos_por_temperatura
+        self.limite_iteracoes = limite_iteracoes
+        self.semente = semente
+        self.verboso = verboso
+        self.criterios_parada = criterios_parada
+
+        # Setados ao executar:
+        self.solucao_atual = None
+        self.melhor = None
+        self.resultados = None
+        self.motivo_parada = None
+        self.motivos_parada = None
+        # Quantas energias foram calculadas
+        self.avaliacoes = 0
+
+    def _iniciar_parada(self):
+        self.motivo_parada = None
+        self.avaliacoes = 0
+        if self.criterios_parada is not None:
+            self.criterios_parada.iniciar()
+
+    def _verificar_parada(self, melhor_energia: float, diversidade: float = None) -> bool:
+        """Consulta os criterios_parada. Se algum foi atingido, guarda o motivo e retorna True."""
+        if self.criterios_parada is None:
+            return False
+
+        self.motivo_parada = self.criterios_parada.verificar(melhor_energia, self.avaliacoes, diversidade=diversidade)
+        return self.motivo_parada is not None
+
+    def _semente_execucao(self):
+        """A semente da execução: a informada ou, se não houver, uma sorteada agora pelo random."""
+        return self.semente if self.semente is not None else getrandbits(64)
+
+    def executar(self, solucao_inicial: Solucao = None) -> Solucao:
+        """
+        Roda uma cadeia, a partir de solucao_inicial (ou de uma solução gerada), e retorna a melhor solução.
+        Usa o random do jeito que ele estiver (a semente só é usada por executar_cadeias).
+        """
+        self._iniciar_parada()
+        temperatura = self.temperatura_inicial
+
+        solucao_atual = solucao_inicial if solucao_inicial is not None else self.classe_solucao.gerar()
+        melhor = solucao_atual
+        self.avaliacoes = 1
+
+        contador = 0
+
+        while temperatura > self.temperatura_final:
+
+            for _ in range(self.passos_por_temperatura):
+                solucao_atual = passo_metropolis(solucao_atual, temperatura, self.verboso)
+
+                if solucao_atual.energia < melhor.energia:
+                    melhor = solucao_atual
+
+            self.avaliacoes += self.passos_por_temperatura
+            temperatura = temperatura * self.decaimento_temperatura
+
+            if self._verificar_parada(melhor.energia):
+                break
+
+            contador += 1
+            if contador >= self.limite_iteracoes:
+                break
+
+        if self.motivo_parada is None:
+            self.motivo_parada = MotivosParada.LIMITE
+
+        self.solucao_atual = solucao_atual
+        self.melhor = melhor
+        return melhor
+
+    def executar_cadeias(self, num_cadeias: int, num_processos: int = None) -> Solucao:
+        """
+        Roda num_cadeias cadeias independentes, espalhadas por num_processos processos (None usa a quantidade
+        de processadores da máquina), e retorna a melhor solução. As melhores de cada cadeia ficam em
+        self.resultados, e o motivo da parada de cada uma em self.motivos_parada.
+        """
+        num_processos = num_processos or os.cpu_count() or 1
+        semente = self._semente_execucao()
+
+        if num_processos <= 1:
+            resultados = [_executar_cadeia(self, semente, cadeia) for cadeia in range(num_cadeias)]
+        else:
+            with ProcessPoolExecutor(max_workers=num_processos) as executor:
+                resultados = list(executor.map(_executar_cadeia, [self] * num_cadeias, [semente] * num_cadeias,
+                                               range(num_cadeias)))
+
+        self.resultados = [solucao for solucao, _ in resultados]
+        self.motivos_parada = [motivo for _, motivo in resultados]
+
+        indice = min(range(num_cadeias), key=lambda i: self.resultados[i].energia)
+        self.melhor = self.resultados[indice]
+        self.motivo_parada = self.motivos_parada[indice]
+        return self.melhor
+
+    def executar_tempera_paralela(self, temperaturas: List[Union[int, float]], passos_entre_trocas: int = 10,
+                                  num_processos: int = None) -> Solucao:
+        """
+        Têmpera paralela (parallel tempering): cada temperatura tem uma réplica, que roda passos_entre_trocas
+        passos de Metropolis em paralelo com as outras. Depois, réplicas de temperaturas vizinhas trocam de
+        estado com probabilidade min(1, exp((Ei - Ej) (1/Ti - 1/Tj))). Assim, as réplicas quentes exploram,
+        e as boas soluções que elas acham descem para as réplicas frias.
+
+        São feitas limite_iteracoes rodadas. Retorna a melhor solução visitada; as soluções finais de cada
+        temperatura ficam em self.resultados.
+        """
+        temperaturas = sorted(temperaturas)
+        if len(temperaturas) < 2 or temperaturas[0] <= 0:
+            raise Exception("Informe pelo menos duas temperaturas, todas positivas.")
+
+        num_processos = num_processos or os.cpu_count() or 1
+        semente = self._semente_execucao()
+        self._iniciar_parada()
+
+        with _semeado(semente):
+            replicas = [self.classe_solucao.gerar() for _ in temperaturas]
+        melhor = min(replicas, key=lambda solucao: solucao.energia)
+        self.avaliacoes = len(replicas)
+        # As trocas têm o seu próprio gerador, porque as réplicas podem rodar neste mesmo processo
+        sorteio_trocas = Random(_derivar_semente(semente, 'trocas'))
+
+        executor = ProcessPoolExecutor(max_workers=num_processos) if num_processos > 1 else None
+        try:
+            for rodada in range(self.limite_iteracoes):
+                argumentos = (replicas, temperaturas, [passos_entre_trocas] * len(replicas),
+                              [semente] * len(replicas), [rodada] * len(replicas), range(len(replicas)))
+                if executor is None:
+                    resultados = list(map(_executar_replica, *argumentos))
+                else:
+                    resultados = list(executor.map(_executar_replica, *argumentos))
+
+                replicas = [solucao for solucao, _ in resultados]
+                melhor = min([melhor] + [melhor_replica for _, melhor_replica in resultados],
+                             key=lambda solucao: solucao.energia)
+
+                # Alterno entre os pares (0,1), (2,3)... e (1,2), (3,4)..., para as trocas não se atrapalharem
+                for i in range(rodada % 2, len(replicas) - 1, 2):
+                    j = i + 1
+                    expoente = ((replicas[i].energia - replicas[j].energia)
+                                * (1 / temperaturas[i] - 1 / temperaturas[j]))
+                    if expoente >= 0 or exp(expoente) > sorteio_trocas.random():
+                        replicas[i], replicas[j] = replicas[j], replicas[i]
+
+                self.avaliacoes += len(replicas) * passos_entre_trocas
+                if self._verificar_parada(melhor.energia):
+                    break
+            else:
+                self.motivo_parada = MotivosParada.LIMITE
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.resultados = replicas
+        self.melhor = melhor
+        return melhor
+
+    def executar_lote(self, num_cadeias: int) -> Solucao:
+        """
+        Roda num_cadeias cadeias de uma vez, com o protocolo de lote da classe (veja Solucao.suporta_lote).
+
+        Todas as cadeias seguem o mesmo resfriamento de executar, mas cada passo (sortear os vizinhos, calcular
+        os deltas de energia e aceitar pelo critério de Metropolis) é feito com operações de array.
+        Retorna a melhor solução visitada. Os valores finais das cadeias ficam em self.resultados.
+        """
+        if not self.classe_solucao.suporta_lote():
+            raise Exception("A classe %s não implementa o protocolo de lote." % self.classe_solucao.__name__)
+
+        gerador = np.random.default_rng(_derivar_semente(self._semente_execucao()))
+        classe = self.classe_solucao
+        self._iniciar_parada()
+
+        valores = classe.gerar_lote(num_cadeias, gerador)
+        energias = classe.energia_lote(valores)
+        indice_melhor = int(np.argmin(energias))
+        melhor_valor, melhor_energia = valores[indice_melhor].copy(), energias[indice_melhor]
+        self.avaliacoes = num_cadeias
+
+        temperatura = self.temperatura_inicial
+        contador = 0
+
+        while temperatura > self.temperatura_final:
+
+            for _ in range(self.passos_por_temperatura):
+                vizinhos = classe.vizinhos_lote(valores, gerador)
+                energias_vizinhos = classe.energia_lote(vizinhos)
+
+                delta_energia = energias_vizinhos - energias
+                # Com delta negativo, a exponencial passa de 1 e o vizinho é sempre aceito
+                with np.errstate(over='ignore'):
+                    aceitos = gerador.random(num_cadeias) < np.exp(-delta_energia / temperatura)
+
+                valores[aceitos] = vizinhos[aceitos]
+                energias[aceitos] = energias_vizinhos[aceitos]
+
+                indice = int(np.argmin(energias))
+                if energias[indice] < melhor_energia:
+                    melhor_valor, melhor_energia = valores[indice].copy(), energias[indice]
+
+            self.avaliacoes += num_cadeias * self.passos_por_temperatura
+            temperatura = temperatura * self.decaimento_temperatura
+
+            diversidade = None
+            if self.criterios_parada is not None and self.criterios_parada.diversidade_minima is not None:
+                diversidade = len(np.unique(valores, axis=0)) / num_cadeias
+            if self._verificar_parada(float(melhor_energia), diversidade):
+                break
+
+            contador += 1
+            if contador >= self.limite_iteracoes:
+                break
+
+        if self.motivo_parada is None:
+            self.motivo_parada = MotivosParada.LIMITE
+
+        self.resultados = valores
+        self.melhor = classe(melhor_valor.tolist())
+        return self.melhor
 
 
+if __name__ == "__main__":
+    """
+    CONFIGURAÇÕES
+    """
+    DECAIMENTO_TEMPERATURA = 0.99
+    TEMPERATURA_INICIAL = 30
+    TEMPERATURA_FINAL = 0
+    PASSOS_POR_TEMPERATURA = 3
+    LIMITE_ITERACOES = 1000
+    # Quantas cadeias independentes rodar, e em quantos processos (None usa todos os processadores).
+    # Se a classe implementar o protocolo de lote, as cadeias andam juntas num processo só
+    NUM_CADEIAS = 1
+    NUM_PROCESSOS = None
+    # Para parar antes: quantas temperaturas sem melhorar a melhor energia, e a energia que já basta (None desliga)
+    PACIENCIA = None
+    ENERGIA_ALVO = None
+
+    classe = SolucaoQuadratica
 
+    """
+    START
+    """
 
+    recozimento = Recozimento(
+        classe,
+        temperatura_inicial=TEMPERATURA_INICIAL,
+        temperatura_final=TEMPERATURA_FINAL,
+        decaimento_temperatura=DECAIMENTO_TEMPERATURA,
+        passos_por_temperatura=PASSOS_POR_TEMPERATURA,
+        limite_iteracoes=LIMITE_ITERACOES,
+        verboso=NUM_CADEIAS == 1,
+        criterios_parada=CriteriosParada(alvo=ENERGIA_ALVO, paciencia=PACIENCIA)
+    )
+
+    if NUM_CADEIAS == 1:
+        solucao = recozimento.executar()
+    elif classe.suporta_lote():
+        solucao = recozimento.executar_lote(NUM_CADEIAS)
+    else:
+        solucao = recozimento.executar_cadeias(NUM_CADEIAS, NUM_PROCESSOS)
+
+    print("Solução: ", solucao)
+    print("Parada: %s, depois de %d avaliações" % (recozimento.motivo_parada.name, recozimento.avaliacoes))
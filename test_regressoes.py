@@ -0,0 +1,392 @@
+"""
+Testes de regressão. Rode com:
+
+    python -m pytest -q
+"""
+from tipos_cromossomos import *
+
+import pytest
+import random as aleatorio
+import time
+
+
+def test_sortear_roleta_aceita_aptidoes_negativas():
+    aleatorio.seed(0)
+    cromossomos = [CromossomoCilindroParabolico.gerar() for _ in range(12)]
+    # Esse problema tem aptidões negativas, como em [3, 6] (-9)
+    cromossomos.append(CromossomoCilindroParabolico([3, 6]))
+
+    selecionados = sortear_roleta(cromossomos, CromossomoCilindroParabolico.avaliar, 5)
+    assert len(selecionados) == 5
+
+
+@pytest.mark.parametrize('usar_lote', [False, True])
+def test_algoritmo_com_roleta_e_aptidoes_negativas(usar_lote):
+    algoritmo = AlgoritmoGenetico(CromossomoCilindroParabolico, selecao=Selecoes.ROLETA, num_geracoes=3,
+                                  semente=0, usar_lote=usar_lote)
+    algoritmo.executar()
+    assert len(algoritmo.cromossomos) == algoritmo.tam_populacao
+
+
+def test_roleta_reprodutivel_com_random_seed():
+    cromossomos = [CromossomoQuadraticoDecimal(float(x)) for x in range(1, 21)]
+
+    aleatorio.seed(3)
+    primeira = sortear_roleta(cromossomos, CromossomoQuadraticoDecimal.avaliar, 5)
+    aleatorio.seed(3)
+    segunda = sortear_roleta(cromossomos, CromossomoQuadraticoDecimal.avaliar, 5)
+
+    assert [c.genes for c in primeira] == [c.genes for c in segunda]
+
+
+def test_retomada_reproduz_a_execucao_original(tmp_path):
+    arquivo = str(tmp_path / 'checkpoint.pkl')
+    parametros = dict(num_geracoes=10, semente=4, selecao=Selecoes.TORNEIO)
+
+    aleatorio.seed(4)
+    original = AlgoritmoGenetico(CromossomoQuadratico, **parametros)
+    original.executar()
+
+    aleatorio.seed(4)
+    interrompido = AlgoritmoGenetico(CromossomoQuadratico, arquivo_checkpoint=arquivo, intervalo_checkpoint=5,
+                                     **parametros)
+    for registro in interrompido.geracoes():
+        if registro['geracao'] == 5:
+            break
+
+    # Bagunça o random, para garantir que a retomada usa o estado salvo
+    aleatorio.seed(99)
+    retomado = AlgoritmoGenetico.retomar(arquivo)
+    retomado.executar()
+
+    assert retomado.geracao == original.geracao
+    assert [c.genes for c in retomado.populacao] == [c.genes for c in original.populacao]
+    assert retomado.aptidoes.tolist() == original.aptidoes.tolist()
+
+
+def test_erro_no_checkpoint_nao_esconde_o_erro_da_execucao(tmp_path, capsys):
+    class CromossomoComDefeito(CromossomoQuadratico):
+        falhar = False
+
+        @staticmethod
+        def avaliar(cromossomo):
+            if CromossomoComDefeito.falhar:
+                raise ValueError("aptidão indisponível")
+            return CromossomoQuadratico.avaliar(cromossomo)
+
+    # O diretório não existe, então a gravação do checkpoint falha
+    arquivo = str(tmp_path / 'nao_existe' / 'checkpoint.pkl')
+    algoritmo = AlgoritmoGenetico(CromossomoComDefeito, arquivo_checkpoint=arquivo, intervalo_checkpoint=1)
+
+    with pytest.raises(ValueError):
+        for registro in algoritmo.geracoes():
+            if registro['geracao'] == 1:
+                CromossomoComDefeito.falhar = True
+
+    assert "Erro ao gravar o checkpoint" in capsys.readouterr().err
+
+
+def test_motor_intersecoes_concorda_com_o_shapely():
+    from shapely.geometry import LineString
+
+    sorteio = aleatorio.Random(7)
+
+    def segmento():
+        # Coordenadas inteiras pequenas, para aparecerem toques e segmentos colineares
+        return [(sorteio.randint(0, 6), sorteio.randint(0, 6)) for _ in range(2)]
+
+    paredes = [segmento() for _ in range(20)]
+    paredes.append(segmento() + [(sorteio.randint(0, 6), sorteio.randint(0, 6))])
+    raios = [segmento() for _ in range(300)]
+    raios = [raio for raio in raios if raio[0] != raio[1]]
+
+    motor = MotorIntersecoes(paredes)
+    contagem = motor.contar(np.array([r[0] for r in raios], dtype=float), np.array([r[1] for r in raios], dtype=float))
+
+    linhas_paredes = [LineString(parede) for parede in paredes if len(set(parede)) > 1]
+    esperado = [sum(LineString(raio).intersects(parede) for parede in linhas_paredes) for raio in raios]
+
+    assert contagem.tolist() == esperado
+
+
+def test_avaliacao_paralela_igual_a_serial():
+    cromossomos = [CromossomoQuadraticoDecimal(float(x)) for x in range(-50, 50)]
+
+    with AvaliadorParalelo(CromossomoQuadraticoDecimal, num_processos=2, tamanho_lote=7) as avaliador:
+        paralelas = avaliador.avaliar(cromossomos)
+
+    assert paralelas == [CromossomoQuadraticoDecimal.avaliar(c) for c in cromossomos]
+
+    parametros = dict(num_geracoes=5, semente=2, selecao=Selecoes.TORNEIO)
+    aleatorio.seed(2)
+    serial = AlgoritmoGenetico(CromossomoQuadraticoDecimal, **parametros)
+    serial.executar()
+    aleatorio.seed(2)
+    paralelo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, num_processos=2, **parametros)
+    paralelo.executar()
+
+    assert paralelo.aptidoes.tolist() == serial.aptidoes.tolist()
+
+
+def test_cache_de_aptidoes_separa_as_classes():
+    class Dobro(CromossomoQuadraticoDecimal):
+        @staticmethod
+        def avaliar(cromossomo):
+            return 2 * CromossomoQuadraticoDecimal.avaliar(cromossomo)
+
+    Cromossomo.ativar_cache()
+    try:
+        assert CromossomoQuadraticoDecimal.avaliar(CromossomoQuadraticoDecimal(100.0)) == 10000
+        assert CromossomoQuadratico.avaliar(CromossomoQuadratico(100)) != 10000
+        assert Dobro.avaliar(Dobro(100.0)) == 20000
+        # A segunda consulta vem do cache, com o mesmo valor
+        assert Dobro.avaliar(Dobro(100.0)) == 20000
+        assert Cromossomo.estatisticas_cache()['acertos'] >= 1
+    finally:
+        Cromossomo.desativar_cache()
+
+
+def test_cache_de_aptidoes_mantem_avaliar_como_classmethod():
+    class CromossomoDezBits(CromossomoBinario):
+        num_bits = 10
+
+        @classmethod
+        def avaliar(cls, cromossomo):
+            return cromossomo.genes + cls.num_bits
+
+    assert CromossomoDezBits.avaliar(CromossomoDezBits(5)) == 15
+    CromossomoDezBits.ativar_cache()
+    try:
+        assert CromossomoDezBits.avaliar(CromossomoDezBits(5)) == 15
+        assert CromossomoDezBits.avaliar(CromossomoDezBits(5)) == 15
+        assert CromossomoDezBits.estatisticas_cache()['acertos'] == 1
+    finally:
+        CromossomoDezBits.desativar_cache()
+
+
+"""AVALIAÇÃO ASSÍNCRONA COM O SIMULADOR DE MENTIRA"""
+
+
+@pytest.fixture
+def simulador(monkeypatch):
+    """Permite acrescentar opções do simulador_stub.py ao comando do CromossomoSimulador."""
+    comando = list(CromossomoSimulador.comando)
+
+    def configurar(*opcoes):
+        monkeypatch.setattr(CromossomoSimulador, 'comando', comando + list(opcoes))
+
+    return configurar
+
+
+def test_simulador_respeita_o_limite_de_concorrencia(simulador):
+    simulador('--atraso', '0.2')
+    em_andamento = []
+    maximo = []
+
+    class CromossomoContado(CromossomoSimulador):
+        @classmethod
+        async def avaliar_async(cls, cromossomo):
+            em_andamento.append(cromossomo)
+            maximo.append(len(em_andamento))
+            try:
+                return await super().avaliar_async(cromossomo)
+            finally:
+                em_andamento.remove(cromossomo)
+
+    cromossomos = [CromossomoContado([float(x), 1.0]) for x in range(6)]
+    aptidoes = AvaliadorAssincrono(CromossomoContado, max_concorrentes=2).avaliar(cromossomos)
+
+    assert aptidoes == [CromossomoCilindroParabolico.avaliar(c) for c in cromossomos]
+    assert max(maximo) == 2
+
+
+def test_simulador_com_tempo_esgotado_usa_aptidao_falha(simulador):
+    simulador('--atraso', '5')
+    avaliador = AvaliadorAssincrono(CromossomoSimulador, tempo_limite=0.5, aptidao_falha=1e9)
+
+    inicio = time.perf_counter()
+    assert avaliador.avaliar([CromossomoSimulador([1.0, 2.0])]) == [1e9]
+    # O processo foi morto, não esperamos os 5 segundos
+    assert time.perf_counter() - inicio < 4
+    assert avaliador.falhas == 1
+
+
+def test_simulador_tenta_de_novo_depois_de_falhar(simulador):
+    simulador('--chance-falha', '1')
+    avaliador = AvaliadorAssincrono(CromossomoSimulador, tentativas=3, aptidao_falha=-1)
+    assert avaliador.avaliar([CromossomoSimulador([1.0, 2.0])]) == [-1]
+    assert avaliador.falhas == 3
+
+    # Com metade das simulações falhando, 30 tentativas bastam para todas darem certo
+    simulador('--chance-falha', '0.5')
+    cromossomos = [CromossomoSimulador([float(x), 2.0]) for x in range(4)]
+    avaliador = AvaliadorAssincrono(CromossomoSimulador, tentativas=30)
+    assert avaliador.avaliar(cromossomos) == [CromossomoCilindroParabolico.avaliar(c) for c in cromossomos]
+
+
+def test_simulador_aceita_genes_negativos_pequenos():
+    cromossomo = CromossomoSimulador([-1e-05, -2.5])
+    assert AvaliadorAssincrono(CromossomoSimulador).avaliar([cromossomo]) == \
+        [pytest.approx(CromossomoCilindroParabolico.avaliar(cromossomo))]
+
+
+"""PLANTA"""
+
+
+def montar_planta_quadrada(granularidade: float = 2, lado: int = 20) -> Planta:
+    planta = Planta(granularidade)
+    cantos = [(0, lado), (lado, lado), (lado, 0), (0, 0)]
+    for inicio, fim in zip(cantos, cantos[1:] + cantos[:1]):
+        planta.adicionar_parede(Ponto(*inicio), Ponto(*fim))
+    return planta
+
+
+def test_pontos_internos_conhecem_seus_vizinhos():
+    planta = montar_planta_quadrada()
+    planta.procurar_pontos_internos(BuscasPontos.VARREDURA)
+
+    ponto = planta.encontrar(Ponto(10, 10))
+    assert ponto.vizinhos == planta.vizinhos_internos(ponto)
+    assert len(ponto.vizinhos) == 4
+    assert all(vizinho in planta.pontos_internos for vizinho in ponto.vizinhos)
+
+    with pytest.raises(Exception):
+        Ponto(10, 10).vizinhos
+
+
+"""MODELO DE ILHAS"""
+
+
+def test_ilhas_recusam_parametros_de_um_processo_so(tmp_path):
+    with pytest.raises(Exception):
+        ModeloIlhas(CromossomoQuadraticoDecimal, num_ilhas=2, arquivo_checkpoint=str(tmp_path / 'ilha.pkl'))
+    with pytest.raises(Exception):
+        ModeloIlhas(CromossomoQuadraticoDecimal, num_ilhas=2, instrumentacao=Instrumentacao())
+
+
+def test_ilhas_reproduziveis_e_com_o_melhor_de_cada_ilha():
+    def executar():
+        ilhas = ModeloIlhas(CromossomoQuadraticoDecimal, num_ilhas=2, intervalo_migracao=3, semente=8,
+                            tam_populacao=10, num_geracoes=7, selecao=Selecoes.TORNEIO)
+        return ilhas, ilhas.executar()
+
+    ilhas, (cromossomo, aptidao) = executar()
+    _, (outro_cromossomo, outra_aptidao) = executar()
+
+    assert (cromossomo.genes, aptidao) == (outro_cromossomo.genes, outra_aptidao)
+    assert aptidao == min(melhor_aptidao for _, melhor_aptidao in ilhas.melhores)
+    for (_, melhor_aptidao), aptidoes in zip(ilhas.melhores, ilhas.aptidoes):
+        # O melhor da ilha é de qualquer geração, então não perde para a população final
+        assert melhor_aptidao <= min(aptidoes)
+
+
+@pytest.mark.parametrize('usar_lote', [False, True])
+def test_populacao_impar_mantem_o_tamanho(usar_lote):
+    algoritmo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, tam_populacao=13, num_geracoes=2, semente=1,
+                                  usar_lote=usar_lote)
+    algoritmo.executar()
+    assert len(algoritmo.cromossomos) == 13
+    assert len(algoritmo.aptidoes) == 13
+
+
+"""PLANTA: CACHES"""
+
+
+def test_discretizacao_salva_e_carregada_do_disco(tmp_path):
+    original = montar_planta_quadrada()
+    original.procurar_pontos_internos(BuscasPontos.VARREDURA, diretorio_cache=str(tmp_path))
+    original.precalcular_atenuacoes()
+
+    carregada = montar_planta_quadrada()
+    carregada.procurar_pontos_internos(BuscasPontos.VARREDURA, diretorio_cache=str(tmp_path))
+
+    assert carregada.pontos_internos == original.pontos_internos
+    assert np.array_equal(carregada.coordenadas_internas, original.coordenadas_internas)
+    assert np.array_equal(carregada.vizinhanca, original.vizinhanca)
+    assert np.array_equal(np.asarray(carregada.tabela_atenuacoes), original.tabela_atenuacoes, equal_nan=True)
+
+    fonte = carregada.encontrar(Ponto(6, 6))
+    assert carregada.pior_sinal(fonte) == original.pior_sinal(original.encontrar(Ponto(6, 6)))
+
+
+def test_cache_de_campos_nao_muda_o_sinal():
+    planta = montar_planta_quadrada(1)
+    planta.adicionar_parede([5, 5], [5, 15])
+    planta.procurar_pontos_internos(BuscasPontos.VARREDURA)
+    fontes = [planta.encontrar(Ponto(x, y)) for x, y in ((2, 2), (12, 8), (2, 2))]
+
+    sem_cache = planta.calcular_sinal(*fontes)
+    planta.ativar_cache_campos(8)
+    com_cache = planta.calcular_sinal(*fontes)
+    de_novo = planta.calcular_sinal(*fontes)
+
+    assert np.array_equal(sem_cache, com_cache, equal_nan=True)
+    assert np.array_equal(sem_cache, de_novo, equal_nan=True)
+    assert planta.estatisticas_cache_campos()['acertos'] >= 3
+
+
+"""RECOZIMENTO"""
+
+
+def test_recozimento_reprodutivel_sem_mexer_no_random():
+    from simulated_annealing import Recozimento, SolucaoQuadratica
+
+    aleatorio.seed(11)
+    esperado = aleatorio.random()
+
+    aleatorio.seed(11)
+    recozimento = Recozimento(SolucaoQuadratica, semente="cadeias", limite_iteracoes=100)
+    primeira = [s.valor for s in (recozimento.executar_cadeias(3, 1), *recozimento.resultados)]
+    segunda = [s.valor for s in (recozimento.executar_cadeias(3, 1), *recozimento.resultados)]
+
+    assert primeira == segunda
+    # O random de quem chamou não foi semeado de novo
+    assert aleatorio.random() == esperado
+
+
+def test_recozimento_em_lote_reprodutivel():
+    from simulated_annealing import Recozimento, SolucaoQuadratica
+
+    recozimento = Recozimento(SolucaoQuadratica, semente="lote", limite_iteracoes=200)
+    primeira = recozimento.executar_lote(50)
+    resultados = recozimento.resultados.copy()
+    segunda = recozimento.executar_lote(50)
+
+    assert primeira.valor == segunda.valor
+    assert np.array_equal(resultados, recozimento.resultados)
+    assert primeira.energia < SolucaoQuadratica.energia_lote(np.array([63.0]))[0]
+
+
+"""CRITÉRIOS DE PARADA"""
+
+
+def test_criterios_de_parada():
+    criterios = CriteriosParada(paciencia=2)
+    assert [criterios.verificar(aptidao, 0) for aptidao in (5, 4, 4, 4)] == \
+        [None, None, None, MotivosParada.PACIENCIA]
+
+    assert CriteriosParada(alvo=1).verificar(0.5, 0) == MotivosParada.ALVO
+    assert CriteriosParada(alvo=1).verificar(0.5, 0, Objetivos.MAXIMIZAR) is None
+    assert CriteriosParada(max_avaliacoes=10).verificar(3, 10) == MotivosParada.AVALIACOES
+    assert CriteriosParada(diversidade_minima=0.5).verificar(3, 0, diversidade=0.2) == MotivosParada.DIVERSIDADE
+
+
+def test_algoritmo_para_pelo_criterio_ou_pelo_limite():
+    algoritmo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, num_geracoes=200, semente=3,
+                                  criterios_parada=CriteriosParada(paciencia=3))
+    algoritmo.executar()
+    assert algoritmo.motivo_parada == MotivosParada.PACIENCIA
+    assert algoritmo.geracao < 200
+
+    algoritmo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, num_geracoes=4, semente=3)
+    algoritmo.executar()
+    assert algoritmo.motivo_parada == MotivosParada.LIMITE
+    assert algoritmo.geracao == 4
+
+
+def test_geracoes_entrega_um_registro_por_geracao():
+    algoritmo = AlgoritmoGenetico(CromossomoQuadraticoDecimal, num_geracoes=5, semente=3)
+    registros = list(algoritmo.geracoes())
+
+    assert [registro['geracao'] for registro in registros] == list(range(6))
+    assert registros[-1]['melhor_aptidao'] == algoritmo.melhor[1]
@@ -1,72 +1,72 @@
-from bitstring import Bits
 from classes_ga import *
 from classes_misc import *
-from random import randrange as numero_aleatorio, random, choice
+from random import randrange as numero_aleatorio, random, choice, choices
 
+import asyncio
+import numpy as np
+import os
+import subprocess
+import sys
 
-class CromossomoQuadratico(Cromossomo):
+
+def mutacionar_lote_decimal(genes: np.ndarray, chance_mutacao: float, gerador: np.random.Generator) -> np.ndarray:
+    """Versão em lote da mutação dos cromossomos decimais: cada linha sorteada com chance chance_mutacao
+    tem cada gene variado aleatoriamente entre -10% e +10% do seu valor."""
+    mutados = gerador.random(len(genes)) <= chance_mutacao
+
+    novos_genes = genes.copy()
+    variacoes = 0.1 * gerador.random((int(mutados.sum()), genes.shape[1]))
+    variacoes *= gerador.choice([1, -1], size=variacoes.shape)
+    novos_genes[mutados] += novos_genes[mutados] * variacoes
+
+    return novos_genes
+
+
+def reproduzir_lote_decimal(pais: np.ndarray, maes: np.ndarray, gerador: np.random.Generator) -> np.ndarray:
+    """Versão em lote da reprodução dos cromossomos decimais: cada gene do filho é o gene do pai (ou da mãe)
+    somado ou subtraído da margem |pai - mãe| / 3. Os dois filhos de cada casal ficam em linhas seguidas."""
+    margens = np.abs(pais - maes) / 3
+
+    filhos = np.stack([pais, maes], axis=1)
+    filhos += margens[:, None, :] * gerador.choice([1, -1], size=filhos.shape)
+
+    return filhos.reshape(-1, pais.shape[1])
+
+
+class CromossomoQuadratico(CromossomoBinario):
     """
     Essa classe vai tratar do problema de encontrar o mínimo da função y = x^2
     Os cromossomos são uma sequência de 7 bits, onde o primeiro bit é o bit de sinal
     ou seja, os cromossomos representarão números inteiros entre -64 e +63
     observação: o método gerar() só gera números a partir de 0
     """
+    num_bits = 7
 
     @staticmethod
     def gerar():
         """Geramos sequência de bits correspondentes a um número aleatório entre zero e numero_maximo"""
         numero_maximo = 63
 
-        numero = numero_aleatorio(0, numero_maximo+1, 1)
-        tam = len(bin(numero_maximo)) - 1
-        return CromossomoQuadratico(Bits(int=numero, length=tam).bin)
+        return CromossomoQuadratico(numero_aleatorio(0, numero_maximo + 1))
 
     @staticmethod
     def avaliar(cromossomo):
         """Avalia a aptidão do cromossomo."""
-        x = Bits(bin=cromossomo.genes).int
+        x = CromossomoQuadratico.decodificar(cromossomo.genes)
         return x**2
 
     @staticmethod
-    def mutacionar(cromossomo: 'CromossomoQuadratico', chance_mutacao: float = 0.03):
-        """Modifica aleatoriamente um gene do cromossomo. Essa mutação tem uma chance chance_mutacao de acontecer."""
-
-        if random() > chance_mutacao:
-            # Não modificar
-            return cromossomo
-
-        indice_gene = numero_aleatorio(0, len(cromossomo.genes))
-        novos_genes = list(cromossomo.genes)
-        gene = novos_genes[indice_gene]
-        novos_genes[indice_gene] = '0' if gene == '1' else '1'
-
-        return CromossomoQuadratico(''.join(novos_genes))
-
-    @staticmethod
-    def reproduzir(pai: 'CromossomoQuadratico', mae: 'CromossomoQuadratico'):
-        """Podem existir vários métodos de reprodução.
-        Cada método deve estar implementado em uma função.
-        Essa função "reproduzir" vai chamar o método "default".
-        """
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Geramos n números aleatórios entre zero e numero_maximo"""
+        numero_maximo = 63
 
-        return CromossomoQuadratico.reproduzir_crossover_1(pai, mae)
+        return gerador.integers(0, numero_maximo + 1, size=(n, 1), dtype=np.uint64)
 
     @staticmethod
-    def reproduzir_crossover_1(pai: 'CromossomoQuadratico', mae: 'CromossomoQuadratico'):
-        """Essa reprodução será crossover de um ponto, onde o ponto é aleatório.
-        Eu gero um cromossomo, só pra pegar o seu tamanho.
-        Depois, eu escolho um ponto aleatório no meio do cromossomo (ou seja, sem pegar o primeiro e último gene)
-        e faço o crossover, gerando dois filhos.
-        """
-        # Tamanho do cromossomo. Esses -2 e +1 abaixo são pra
-        # eu pegar entre o primeiro e último gene, sem incluí-los.
-        num_genes = len(CromossomoQuadratico.gerar().genes) - 2
-        cut_point = int(num_genes * random()) + 1
-
-        filho_1 = pai.genes[:cut_point] + mae.genes[cut_point:]
-        filho_2 = mae.genes[:cut_point] + pai.genes[cut_point:]
-
-        return [CromossomoQuadratico(filho_1), CromossomoQuadratico(filho_2)]
+    def avaliar_lote(genes: np.ndarray) -> np.ndarray:
+        """Avalia a aptidão de cada linha de genes."""
+        x = CromossomoQuadratico.decodificar_lote(genes)
+        return x.astype(float) ** 2
 
 
 class CromossomoQuadraticoDecimal(Cromossomo):
@@ -126,6 +126,28 @@ class CromossomoQuadraticoDecimal(Cromossomo):
 
         return [CromossomoQuadraticoDecimal(filho_1), CromossomoQuadraticoDecimal(filho_2)]
 
+    """PROTOCOLO DE LOTE: os genes de cada cromossomo são uma linha de um array (n, 1)"""
+
+    @staticmethod
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Geramos n números aleatórios entre -numero_maximo e +numero_maximo"""
+        numero_maximo = 63
+
+        return numero_maximo * gerador.uniform(-1, 1, size=(n, 1))
+
+    @staticmethod
+    def avaliar_lote(genes: np.ndarray) -> np.ndarray:
+        """Avalia a aptidão de cada linha de genes."""
+
+        return genes[:, 0] ** 2
+
+    mutacionar_lote = staticmethod(mutacionar_lote_decimal)
+    reproduzir_lote = staticmethod(reproduzir_lote_decimal)
+
+    @staticmethod
+    def de_lote(genes: np.ndarray):
+        return [CromossomoQuadraticoDecimal(float(gene)) for gene in genes[:, 0]]
+
 
 class CromossomoCilindroParabolico(Cromossomo):
     """
@@ -197,12 +219,40 @@ class CromossomoCilindroParabolico(Cromossomo):
 
         return [CromossomoCilindroParabolico(genes_filho_1), CromossomoCilindroParabolico(genes_filho_2)]
 
+    """PROTOCOLO DE LOTE: os genes de cada cromossomo são uma linha [x, y] de um array (n, 2)"""
+
+    @staticmethod
+    def gerar_lote(n: int, gerador: np.random.Generator) -> np.ndarray:
+        """Geramos n pares de números aleatórios entre -numero_maximo e +numero_maximo"""
+        numero_maximo = 63
+
+        return numero_maximo * gerador.uniform(-1, 1, size=(n, 2))
+
+    @staticmethod
+    def avaliar_lote(genes: np.ndarray) -> np.ndarray:
+        """Avalia a aptidão de cada linha de genes."""
+        x, y = genes[:, 0], genes[:, 1]
+
+        return x**2 - 2*x*y + 6*x + y**2 - 6*y
+
+    mutacionar_lote = staticmethod(mutacionar_lote_decimal)
+    reproduzir_lote = staticmethod(reproduzir_lote_decimal)
+
+    @staticmethod
+    def de_lote(genes: np.ndarray):
+        return [CromossomoCilindroParabolico(linha) for linha in genes.tolist()]
+
 
 class CromossomoPotencia(Cromossomo):
 
     planta = None
     k = 1
 
+    @classmethod
+    def estado_compartilhado(cls):
+        """A avaliação depende da planta e da quantidade de roteadores."""
+        return {'planta': cls.planta, 'k': cls.k}
+
     @staticmethod
     def gerar():
         if not CromossomoPotencia.planta.pontos_internos:
@@ -212,9 +262,8 @@ class CromossomoPotencia(Cromossomo):
 
     @staticmethod
     def avaliar(cromossomo: 'Cromossomo'):
-        CromossomoPotencia.planta.simular_fontes(*cromossomo.genes)
-        # Vamos pular os pontos que são fontes
-        return max([ponto.valor for ponto in CromossomoPotencia.planta.pontos_internos if ponto not in CromossomoPotencia.planta.fontes])
+        """A aptidão é o pior sinal dentre os pontos internos, considerando a melhor fonte para cada ponto."""
+        return CromossomoPotencia.planta.pior_sinal(*cromossomo.genes)
 
     @staticmethod
     def reproduzir(pai: 'Cromossomo', mae: 'Cromossomo'):
@@ -240,6 +289,8 @@ class CromossomoPotencia(Cromossomo):
             while not achou:
                 # Para cada gene do pai e da mãe, vamos gerar dois filhos. Enquanto tiver algum filho caindo
                 # fora da planta, vamos ficar reproduzindo.
+                if Instrumentacao.ativa is not None:
+                    Instrumentacao.ativa.contar('tentativas_reproducao')
 
                 """Margem entre o roteador do pai e roteador da mãe"""
                 margem_x = abs(genes[0].x - genes[1].x) / 2
@@ -270,8 +321,7 @@ class CromossomoPotencia(Cromossomo):
     def mutacionar(cromossomo: 'Cromossomo', chance_mutacao: float):
         """A mutação é simples: pega um dos vizinhos de cada fonte no gene.
 
-        Se eu não conseguir encontrar um vizinho que esteja DENTRO da planta com até 8 tentativas,
-        eu não mudo aquela fonte."""
+        Só valem os vizinhos que estão DENTRO da planta. Se uma fonte não tiver nenhum, eu não mudo aquela fonte."""
 
         if random() > chance_mutacao:
             # Não modificar
@@ -280,25 +330,80 @@ class CromossomoPotencia(Cromossomo):
         novo_cromossomo = []
 
         for gene in cromossomo.genes: # vamos tentar achar um vizinho pra cada fonte dentro dos genes...
-            vizinho = choice(gene.vizinhos)
-            achou = False
-            for _ in range(8):
-                # Um ponto pode ter um vizinho fora da planta. Vamos tentar achar um vizinho dentro da planta até 8
-                # vezes.
-                if CromossomoPotencia.planta.encontrar(vizinho):
-                    achou = True
-                    break
-                vizinho = choice(gene.vizinhos)
+            vizinhos = CromossomoPotencia.planta.vizinhos_internos(gene)
 
-            if not achou:
+            if vizinhos:
+                novo_cromossomo.append(choice(vizinhos))
+            else:
                 # infelizmente não achei um vizinho. aquela parte do gene vai permanecer como está
-                vizinho = gene
-
-            novo_cromossomo.append(vizinho)
+                novo_cromossomo.append(gene)
 
         return CromossomoPotencia(novo_cromossomo)
 
 
+class CromossomoSimulador(Cromossomo):
+    """
+    O mesmo problema do CromossomoCilindroParabolico, mas a aptidão vem de um simulador externo: um processo
+    que recebe os genes na linha de comando e imprime a aptidão (por padrão, o simulador_stub.py).
+
+    Serve de exemplo para a avaliação assíncrona: avaliar_async espera o processo sem bloquear o loop,
+    então o AvaliadorAssincrono consegue deixar várias simulações rodando ao mesmo tempo.
+    """
+    # Comando que roda o simulador (os genes são acrescentados no fim)
+    comando = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simulador_stub.py')]
+
+    @classmethod
+    def estado_compartilhado(cls):
+        return {'comando': cls.comando}
+
+    @staticmethod
+    def argumentos(cromossomo: 'CromossomoSimulador'):
+        # O '--' impede que genes negativos, como -1e-05, sejam lidos como opções
+        return CromossomoSimulador.comando + ['--'] + [repr(float(gene)) for gene in cromossomo.genes]
+
+    @staticmethod
+    def avaliar(cromossomo: 'CromossomoSimulador'):
+        """Roda o simulador e espera a resposta."""
+        resultado = subprocess.run(CromossomoSimulador.argumentos(cromossomo), capture_output=True, text=True)
+        if resultado.returncode != 0:
+            raise Exception("O simulador falhou: %s" % resultado.stderr.strip())
+        return float(resultado.stdout)
+
+    @classmethod
+    async def avaliar_async(cls, cromossomo: 'CromossomoSimulador'):
+        """Roda o simulador sem bloquear o loop. Se a avaliação for cancelada (por tempo esgotado), mata o processo."""
+        processo = await asyncio.create_subprocess_exec(
+            *cls.argumentos(cromossomo), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            saida, erro = await processo.communicate()
+        except asyncio.CancelledError:
+            processo.kill()
+            await processo.wait()
+            raise
+
+        if processo.returncode != 0:
+            raise Exception("O simulador falhou: %s" % erro.decode().strip())
+        return float(saida)
+
+    """A geração, a mutação e a reprodução são as do CromossomoCilindroParabolico"""
+
+    @staticmethod
+    def gerar():
+        return CromossomoSimulador(CromossomoCilindroParabolico.gerar().genes)
+
+    @staticmethod
+    def mutacionar(cromossomo: 'CromossomoSimulador', chance_mutacao: float = 0.03):
+        mutado = CromossomoCilindroParabolico.mutacionar(CromossomoCilindroParabolico(cromossomo.genes), chance_mutacao)
+        return CromossomoSimulador(mutado.genes)
+
+    @staticmethod
+    def reproduzir(pai: 'CromossomoSimulador', mae: 'CromossomoSimulador'):
+        filhos = CromossomoCilindroParabolico.reproduzir(CromossomoCilindroParabolico(pai.genes),
+                                                         CromossomoCilindroParabolico(mae.genes))
+        return [CromossomoSimulador(filho.genes) for filho in filhos]
+
+
 if __name__ == "__main__":
     planta = Planta(4)
     lado_quadrado = 20